@@ -0,0 +1,254 @@
+import re
+import threading
+
+import numpy as np
+
+from datasource import TOTAL_LABEL
+
+# Dimensions a cube can be rolled up by
+LEVELS = ('salesperson', 'location', 'week', 'month')
+
+_ISO_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def month_of(week_ending):
+    # 'YYYY-MM-DD' -> 'YYYY-MM'; the store saves weeks as ISO dates, other labels stay as they are
+    return week_ending[:7] if _ISO_DATE.match(week_ending) else week_ending
+
+
+def _as_python(values):
+    # Whole-number results go back as ints so templates print "176", not "176.0"
+    if values.size and np.all(np.mod(values, 1) == 0):
+        return values.astype(np.int64).tolist()
+    return values.tolist()
+
+
+class ActivityCube:
+    """Daily activity as a (rows x categories) array with per-row dimension labels.
+
+    Totals and rollups are computed with vectorized sums and cached; update_row()
+    applies a day's change to every cached result as a delta instead of
+    recomputing them.
+    """
+
+    def __init__(self, values, dims):
+        self.values = np.asarray(values, dtype=np.float64)
+        if self.values.ndim != 2:
+            self.values = self.values.reshape(len(self.values), -1)
+        self.dims = {name: np.asarray(labels) for name, labels in dims.items()}
+        if 'month' not in self.dims and 'week' in self.dims:
+            self.dims['month'] = np.array([month_of(w) for w in self.dims['week']])
+        self._totals = None
+        self._groups = {}
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def totals(self):
+        if self._totals is None:
+            self._totals = self.values.sum(axis=0)
+        # Copies: the cached arrays are adjusted in place by update_row()
+        return self._totals.copy()
+
+    def _group(self, by):
+        cached = self._groups.get(by)
+        if cached is not None:
+            return cached
+        n = len(self.values)
+        codes = np.zeros(n, dtype=np.int64)
+        for name in by:
+            uniq, inverse = np.unique(self.dims[name], return_inverse=True)
+            # Re-densify after each level so combined codes never overflow
+            codes = np.unique(codes * len(uniq) + inverse, return_inverse=True)[1]
+        k = int(codes.max()) + 1 if n else 0
+        sums = np.empty((k, self.values.shape[1]), dtype=np.float64)
+        for j in range(self.values.shape[1]):
+            sums[:, j] = np.bincount(codes, weights=self.values[:, j], minlength=k)
+        first = np.empty(k, dtype=np.int64)
+        first[codes[::-1]] = np.arange(n - 1, -1, -1)
+        labels = [tuple(str(self.dims[name][i]) for name in by) for i in first]
+        self._groups[by] = (labels, codes, sums)
+        return self._groups[by]
+
+    def rollup(self, by):
+        """Sum rows grouped by the given dimension names; returns (labels, sums)."""
+        labels, _, sums = self._group(tuple(by))
+        return labels, sums.copy()
+
+    def update_row(self, row, new_values):
+        """Replace one row's values, adjusting cached totals and rollups by the difference."""
+        new_values = np.asarray(new_values, dtype=np.float64)
+        delta = new_values - self.values[row]
+        self.values[row] = new_values
+        if self._totals is not None:
+            self._totals += delta
+        for _, codes, sums in self._groups.values():
+            sums[codes[row]] += delta
+        return delta
+
+
+def variance(totals, goal):
+    return np.asarray(totals, dtype=np.float64) - np.asarray(goal, dtype=np.float64)
+
+
+def cube_from_rows(rows, n_categories):
+    """Pivot (salesperson, location, week_ending, day, day_name, category, value) rows into a cube.
+
+    Rows must be ordered so each day's categories are adjacent, as
+    ReportStore.activity_rows() returns them.
+    """
+    if not rows:
+        empty = np.array([], dtype=object)
+        return ActivityCube(np.zeros((0, n_categories)),
+                            {'salesperson': empty, 'location': empty, 'week': empty, 'day': empty})
+    salesperson, location, week, day, day_name, category, value = (np.array(col, dtype=object) for col in zip(*rows))
+    boundary = np.zeros(len(value), dtype=bool)
+    boundary[0] = True
+    for col in (salesperson, location, week, day):
+        boundary[1:] |= col[1:] != col[:-1]
+    row = np.cumsum(boundary) - 1
+    first = np.flatnonzero(boundary)
+    values = np.zeros((len(first), n_categories), dtype=np.float64)
+    values[row, category.astype(np.int64)] = value.astype(np.float64)
+    return ActivityCube(values, {
+        'salesperson': salesperson[first],
+        'location': location[first],
+        'week': week[first],
+        'day': day_name[first],
+    })
+
+
+def cube_from_goal_rows(rows, n_categories):
+    """Pivot (salesperson, location, week_ending, category, goal) rows into a week-level cube."""
+    return cube_from_rows([(s, l, w, 0, '', c, g) for s, l, w, c, g in rows], n_categories)
+
+
+def _report(by, labels, sums, totals, goal, week_ending, categories, salesperson, location):
+    # Each group becomes one row in 'days'; the last column is the row total and
+    # totals/goal/variance carry a grand total, matching the weekly report layout
+    row_totals = sums.sum(axis=1)
+    totals = np.append(totals, totals.sum())
+    goal = np.append(goal, goal.sum())
+    return {
+        'weekEnding': week_ending,
+        'today': '',
+        'salesperson': salesperson,
+        'location': location,
+        'days': [
+            {'name': ' / '.join(label), 'values': _as_python(np.append(row, total))}
+            for label, row, total in zip(labels, sums, row_totals)
+        ],
+        'categories': list(categories),
+        'totals': _as_python(totals),
+        'goal': _as_python(goal),
+        'variance': _as_python(variance(totals, goal)),
+        'explanation': '',
+        # Levels the day rows are grouped by, so renderers can tell a rollup from a weekly report
+        'rollup': list(by),
+    }
+
+
+def rollup_report(activity, goals, by, categories, salesperson='All', location='All'):
+    """Roll activity and goals up by `by` and return a report in the staticData shape."""
+    labels, sums = activity.rollup(by)
+    weeks = activity.dims.get('week')
+    week_ending = str(max(weeks)) if weeks is not None and len(weeks) else ''
+    return _report(by, labels, sums, activity.totals(), goals.totals(), week_ending, categories, salesperson, location)
+
+
+def _selected(cube, levels, wanted):
+    # Rollup by levels, keeping the groups whose leading labels equal `wanted` (with those labels dropped)
+    labels, sums = cube.rollup(levels)
+    keep = [i for i, label in enumerate(labels) if label[:len(wanted)] == wanted]
+    return [labels[i][len(wanted):] for i in keep], sums[keep]
+
+
+def _row_index(cube):
+    # ReportStore key (salesperson, week_ending, location) -> cube rows, in day order
+    index = {}
+    keys = zip(cube.dims['salesperson'].tolist(), cube.dims['week'].tolist(), cube.dims['location'].tolist())
+    for row, key in enumerate(keys):
+        index.setdefault(key, []).append(row)
+    return index
+
+
+def _padded(values, n):
+    values = list(values)
+    return values + [0] * (n - len(values))
+
+
+class _CubeState:
+    def __init__(self, revision, categories, activity, goals):
+        self.revision = revision
+        self.categories = categories
+        self.activity = activity
+        self.goals = goals
+        self.activity_rows = _row_index(activity)
+        self.goal_rows = _row_index(goals)
+
+
+class RollupCache:
+    """Activity and goal cubes for the whole ReportStore, built once per process and kept current.
+
+    Registers apply() with the store, so each save_report() in this process
+    updates the saved week's rows with ActivityCube.update_row() and the
+    cached totals and rollups move by the delta. A save that changes the
+    cube's shape (new week, days or categories) or one made by another
+    process leaves the store revision ahead of the cube, which is then rebuilt
+    on the next query. Salesperson and location filters pick groups out of
+    rollups led by those levels, so filtered reports read cached sums too.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._state = None
+        store.add_save_listener(self.apply)
+
+    def _build(self):
+        revision = self.store.revision()
+        categories = self.store.categories()
+        return _CubeState(revision, categories,
+                          cube_from_rows(self.store.activity_rows(), len(categories)),
+                          cube_from_goal_rows(self.store.goal_rows(), len(categories)))
+
+    def apply(self, revision, key, categories, days, goal):
+        with self._lock:
+            state, self._state = self._state, None
+            if state is None or state.revision != revision - 1 or categories != state.categories:
+                return
+            rows = state.activity_rows.get(key, [])
+            goal_rows = state.goal_rows.get(key, [])
+            if len(rows) != len(days) or len(goal_rows) != 1:
+                return
+            day_names = state.activity.dims['day']
+            if any(day_names[row] != name for row, (name, _) in zip(rows, days)):
+                return
+            n = len(categories)
+            for row, (_, values) in zip(rows, days):
+                state.activity.update_row(row, _padded(values, n))
+            state.goals.update_row(goal_rows[0], _padded(goal, n))
+            state.revision = revision
+            self._state = state
+
+    def report(self, by, salesperson=None, location=None):
+        """Rollup report by `by`, optionally for one salesperson and/or location; None when nothing matches."""
+        filters = [(level, value) for level, value in (('salesperson', salesperson), ('location', location))
+                   if value is not None]
+        levels = tuple(level for level, _ in filters)
+        wanted = tuple(str(value) for _, value in filters)
+        with self._lock:
+            revision = self.store.revision()
+            if self._state is None or self._state.revision != revision:
+                self._state = self._build()
+            state = self._state
+            labels, sums = _selected(state.activity, levels + tuple(by), wanted)
+            if not labels:
+                return None
+            _, totals = _selected(state.activity, levels, wanted)
+            _, goal = _selected(state.goals, levels, wanted)
+            weeks, _ = _selected(state.activity, levels + ('week',), wanted)
+        n = len(state.categories)
+        return _report(by, labels, sums, totals[0], goal[0] if len(goal) else np.zeros(n), max(w[0] for w in weeks),
+                       state.categories + [TOTAL_LABEL], salesperson or 'All', location or 'All')
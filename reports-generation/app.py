@@ -1,19 +1,25 @@
-from flask import Flask, send_file, make_response, render_template_string
+from flask import Flask, Response, jsonify, request, send_file, url_for, make_response, render_template_string, stream_with_context
 import io
 from datetime import datetime
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import mm
 import re
 import os
+import threading
+from rtf_template import CompiledTemplate, compile_template
+from rtf_convert import iter_rtf_html, rtf_to_text_lines
+from template_cache import template_cache
+from output_cache import content_key, output_cache
+from compress import MIN_SIZE, compress_bytes, compress_stream, negotiate, variant_key
+from batch import get_executor, safe_filename, stream_zip
+from jobs import QueueFull, job_manager
+from datasource import ReportStore
+from backends import load_backend, warm_up
+from metrics import StageTimer, finish_request, metrics, stage, start_request
 
 app = Flask(__name__)
 
-# Static data matching the screenshot fields
+# Seed data matching the screenshot fields, loaded into an empty report database
 staticData = {
-    'weekEnding': 'Date',
+    'weekEnding': '2024-01-07',
     'today': 'Date',
     'salesperson': 'Name',
     'location': 'Location',
@@ -38,28 +44,103 @@ staticData = {
 }
 
 TEMPLATE_PATH = 'template.rtf'
+# Rollup reports have a row per group instead of fixed weekdays, so they fill a table slot instead
+ROLLUP_TEMPLATE_PATH = 'template_rollup.rtf'
+REPORTS_DB = os.environ.get('REPORTS_DB', 'reports.db')
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
 
-# Helper: Fill RTF template with data
-def fill_rtf_template(template, data):
-    flat = {
+report_store = ReportStore(REPORTS_DB)
+report_store.init_schema()
+if report_store.is_empty():
+    report_store.save_report(staticData)
+
+# Export backends load on first use; REPORT_WARMUP=pdf,xlsx (or all) imports them now instead
+warm_up()
+
+# Helper: Report selected by ?salesperson=&weekEnding=&location=; keys not given match any, latest week first
+def current_report():
+    salesperson = request.args.get('salesperson')
+    location = request.args.get('location')
+    if request.args.get('rollup'):
+        return rollup_current_report(salesperson, location)
+    return report_store.get_report(salesperson, request.args.get('weekEnding'), location)
+
+# Rollup cubes over the whole store, built on the first ?rollup= request and kept current by save_report
+rollup_cache = None
+_rollup_cache_lock = threading.Lock()
+
+# Helper: ?rollup=week|month|location|salesperson (comma-separated for several levels) report
+def rollup_current_report(salesperson=None, location=None):
+    global rollup_cache
+    aggregation = load_backend('rollup')
+    by = tuple(request.args['rollup'].split(','))
+    if any(level not in aggregation.LEVELS for level in by):
+        return None
+    with _rollup_cache_lock:
+        if rollup_cache is None:
+            rollup_cache = aggregation.RollupCache(report_store)
+    return rollup_cache.report(by, salesperson, location)
+
+# Helper: Escape text for an RTF body; non-ASCII goes out as signed UTF-16 \uN units with a '?' fallback
+def rtf_escape(text):
+    out = []
+    for c in str(text):
+        if c in '\\{}':
+            out.append('\\' + c)
+        elif ord(c) < 128:
+            out.append(c)
+        else:
+            units = c.encode('utf-16-le')
+            out.extend(f"\\u{int.from_bytes(units[i:i + 2], 'little', signed=True)}?" for i in range(0, len(units), 2))
+    return ''.join(out)
+
+# Helper: The whole table of a rollup report as RTF rows: header, one row per group, totals/goal/variance
+def rollup_table_rtf(data):
+    rows = [['GROUP'] + data['categories']]
+    rows += [[day['name']] + day['values'] for day in data['days']]
+    rows.append([''])
+    rows += [['Totals'] + data['totals'], ['GOAL'] + data['goal'], ['VARIANCE'] + data['variance']]
+    return '\n'.join('\\tab '.join(rtf_escape(cell) for cell in row) + '\\par' for row in rows)
+
+# Helper: Template for a report: rollups use the table template, weekly reports the weekday one
+def report_template_path(data):
+    return ROLLUP_TEMPLATE_PATH if data.get('rollup') else TEMPLATE_PATH
+
+# Helper: Flatten report data into the ${...} keys used by the RTF template
+def rtf_context(data):
+    if data.get('rollup'):
+        return {
+            'salesperson': data['salesperson'],
+            'weekEnding': data['weekEnding'],
+            'location': data['location'],
+            'rollup_levels': ', '.join(data['rollup']),
+            'rollup_table': rollup_table_rtf(data),
+        }
+    context = {
         'salesperson': data['salesperson'],
         'weekEnding': data['weekEnding'],
         'today': data['today'],
         'location': data['location'],
     }
-    result = template
-    for key, value in flat.items():
-        result = re.sub(r'\${' + re.escape(key) + r'}', str(value), result)
-    for i, cat in enumerate(data['categories']):
-        safe_cat = re.sub(r'[^A-Za-z0-9]', '', cat)
-        result = re.sub(r'\${totals_' + safe_cat + r'}', str(data['totals'][i]), result)
-        result = re.sub(r'\${goal_' + safe_cat + r'}', str(data['goal'][i]), result)
-        result = re.sub(r'\${variance_' + safe_cat + r'}', str(data['variance'][i]), result)
+    safe_cats = [re.sub(r'[^A-Za-z0-9]', '', cat) for cat in data['categories']]
+    for i, safe_cat in enumerate(safe_cats):
+        context['totals_' + safe_cat] = data['totals'][i]
+        context['goal_' + safe_cat] = data['goal'][i]
+        context['variance_' + safe_cat] = data['variance'][i]
     for day in data['days']:
-        for i, cat in enumerate(data['categories']):
-            safe_cat = re.sub(r'[^A-Za-z0-9]', '', cat)
-            result = re.sub(r'\${day_' + day['name'] + '_' + safe_cat + r'}', str(day['values'][i]), result)
-    return result
+        for i, safe_cat in enumerate(safe_cats):
+            context['day_' + day['name'] + '_' + safe_cat] = day['values'][i]
+    return context
+
+# Helper: Fill RTF template with data (template may be raw text or already compiled)
+def fill_rtf_template(template, data):
+    if not isinstance(template, CompiledTemplate):
+        template = compile_template(template)
+    return template.render(rtf_context(data))
+
+# Per-request timing for /metrics and the optional Server-Timing breakdown
+app.before_request(start_request)
+app.after_request(finish_request)
 
 # Route: Home
 @app.route('/')
@@ -67,155 +148,257 @@ def home():
     return '''<h2>Sales Activity Report Generator</h2><ul>
         <li><a href="/report/pdf">Download PDF Report</a></li>
         <li><a href="/report/xls">Download XLS Report</a></li>
+        <li><a href="/report/xls/stream">Download XLS Report (all salespeople, streamed)</a></li>
         <li><a href="/report/rtf">Download PDF Report (from template)</a></li>
         <li><a href="/report/rtf/html">Preview RTF Report as HTML</a></li>
     </ul>'''
 
+# Helper: Encoded body for the negotiated Content-Encoding (None leaves small or incompressible bodies as they are)
+def encode_body(body, encoding):
+    if encoding is None or len(body) < MIN_SIZE:
+        return body, None
+    with stage('compress'):
+        return compress_bytes(body, encoding), encoding
+
+# Helper: Mark a response as varying by Accept-Encoding and label its encoding
+def set_encoding_headers(response, encoding):
+    response.vary.add('Accept-Encoding')
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+
+# Helper: Serve rendered report bytes from the output cache, with ETag/304 support.
+# Compressed variants are cached next to the plain output under their own key/ETag.
+def send_cached_report(fmt, data, render, download_name, mimetype):
+    etag = content_key(data, fmt)
+    encoding = negotiate(request.accept_encodings, mimetype)
+    etag_variant = variant_key(etag, encoding)
+    # Either representation's ETag validates: both decode to the same report
+    matched = next((tag for tag in (etag_variant, etag) if request.if_none_match.contains(tag)), None)
+    if matched is not None:
+        response = Response(status=304)
+        etag_variant, encoding = matched, None
+    else:
+        with stage('cache_lookup'):
+            body = output_cache.get(etag_variant)
+            plain = None if body is not None or encoding is None else output_cache.get(etag)
+        if body is None:
+            if plain is None:
+                plain = render(data)
+                output_cache.put(etag, plain)
+            body, encoding = encode_body(plain, encoding)
+            etag_variant = variant_key(etag, encoding)
+            if encoding is not None:
+                output_cache.put(etag_variant, body)
+        with stage('send_file'):
+            response = send_file(io.BytesIO(body), as_attachment=True, download_name=download_name, mimetype=mimetype, etag=False)
+    response.set_etag(etag_variant)
+    set_encoding_headers(response, encoding)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# Helper: Render the styled landscape PDF report (ReportLab is imported on first use)
+def render_pdf(data):
+    return load_backend('pdf').render_pdf(data)
+
 # Route: PDF (styled, landscape)
 @app.route('/report/pdf')
 def report_pdf():
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=landscape(A4))
-    width, height = landscape(A4)
-    c.setFont('Helvetica-Bold', 22)
-    c.drawString(30, height-40, 'WEEKLY SALES ACTIVITY')
-    c.setFont('Helvetica', 10)
-    c.drawString(30, height-60, f"SALESPERSON  {staticData['salesperson']}")
-    c.drawString(300, height-60, f"WEEK ENDING  {staticData['weekEnding']}")
-    c.drawString(30, height-75, f"LOCATION  {staticData['location']}")
-    c.drawString(300, height-75, f"TODAY'S DATE  {staticData['today']}")
-    y = height-100
-    # Table header
-    c.setFont('Helvetica-Bold', 9)
-    x = 30
-    col_widths = [60, 65, 65, 65, 65, 65, 65, 65, 65, 65, 70]
-    c.drawString(x, y, 'DAYS')
-    for i, cat in enumerate(staticData['categories']):
-        c.drawString(x + sum(col_widths[:i+1]), y, cat)
-    y -= 20
-    # Table rows
-    c.setFont('Helvetica', 9)
-    for day in staticData['days']:
-        c.drawString(x, y, day['name'])
-        for i, val in enumerate(day['values']):
-            c.drawRightString(x + sum(col_widths[:i+1]) + col_widths[i+1] - 4, y, f"${val:.2f}" if val else "$0.00")
-        y -= 20
-    # Totals, Goal, Variance
-    c.setFont('Helvetica-Bold', 9)
-    c.drawString(x, y, 'Totals')
-    for i, val in enumerate(staticData['totals']):
-        c.drawRightString(x + sum(col_widths[:i+1]) + col_widths[i+1] - 4, y, f"${val:.2f}")
-    y -= 20
-    c.setFont('Helvetica', 9)
-    c.drawString(x, y, 'GOAL')
-    for i, val in enumerate(staticData['goal']):
-        c.drawRightString(x + sum(col_widths[:i+1]) + col_widths[i+1] - 4, y, f"${val:.2f}")
-    y -= 20
-    c.setFont('Helvetica', 9)
-    c.drawString(x, y, 'VARIANCE')
-    for i, val in enumerate(staticData['variance']):
-        c.drawRightString(x + sum(col_widths[:i+1]) + col_widths[i+1] - 4, y, f"${val:+.2f}")
-    y -= 30
-    c.setFont('Helvetica', 10)
-    c.drawString(x, y, '*EXPLANATION')
-    y -= 30
-    c.drawString(x, y, 'Approval')
-    c.save()
-    buffer.seek(0)
-    return send_file(buffer, as_attachment=True, download_name='sales-activity-report.pdf', mimetype='application/pdf')
+    data = current_report()
+    if data is None:
+        return 'Report not found.', 404
+    return send_cached_report('pdf', data, render_pdf, 'sales-activity-report.pdf', 'application/pdf')
+
+# Helper: Render the XLSX report (openpyxl is imported on first use)
+def render_xls(data):
+    return load_backend('xlsx').render_xls(data)
 
 # Route: XLS
 @app.route('/report/xls')
 def report_xls():
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = 'Weekly Report'
-    ws.merge_cells('A1:K1')
-    ws['A1'] = 'WEEKLY SALES ACTIVITY'
-    ws['A1'].font = Font(bold=True, size=16)
-    ws['A1'].alignment = Alignment(horizontal='center')
-    ws['A2'] = 'SALESPERSON'
-    ws['B2'] = staticData['salesperson']
-    ws['D2'] = 'WEEK ENDING'
-    ws['E2'] = staticData['weekEnding']
-    ws['G2'] = 'LOCATION'
-    ws['H2'] = staticData['location']
-    ws['J2'] = "TODAY'S DATE"
-    ws['K2'] = staticData['today']
-    ws.append([])
-    header = ['DAYS'] + staticData['categories']
-    ws.append(header)
-    for cell in ws[4]:
-        cell.font = Font(bold=True, color='B97A2A')
-        cell.fill = PatternFill('solid', fgColor='FFF3E0')
-        cell.alignment = Alignment(horizontal='center')
-    for day in staticData['days']:
-        ws.append([day['name']] + [f"${v:.2f}" if v else "$0.00" for v in day['values']])
-    ws.append(['Totals'] + [f"${v:.2f}" for v in staticData['totals']])
-    for cell in ws[ws.max_row]:
-        cell.font = Font(bold=True, color='FFFFFF')
-        cell.fill = PatternFill('solid', fgColor='21523B')
-    ws.append(['GOAL'] + [f"${v:.2f}" for v in staticData['goal']])
-    for cell in ws[ws.max_row]:
-        cell.font = Font(bold=True, color='B97A2A')
-        cell.fill = PatternFill('solid', fgColor='FFF3E0')
-    ws.append(['VARIANCE'] + [f"${v:+.2f}" for v in staticData['variance']])
-    for cell in ws[ws.max_row]:
-        cell.font = Font(bold=True, color='21523B')
-        cell.fill = PatternFill('solid', fgColor='E0E0E0')
-    ws.append([])
-    ws.append(['*EXPLANATION'])
-    ws.append([''])
-    ws.append(['Approval'])
-    ws.append([''])
-    for i, w in enumerate([12, 14, 14, 14, 14, 14, 14, 14, 14, 14, 16], 1):
-        ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = w
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    return send_file(buffer, as_attachment=True, download_name='sales-activity-report.xlsx', mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    data = current_report()
+    if data is None:
+        return 'Report not found.', 404
+    return send_cached_report('xlsx', data, render_xls, 'sales-activity-report.xlsx', XLSX_MIMETYPE)
+
+# Helper: Weekly reports ordered by salesperson, as the streaming exports consume them
+def iter_reports():
+    return report_store.iter_reports()
+
+# Helper: Look up one salesperson's weekly report
+def find_report(salesperson, week_ending, location=None):
+    return report_store.get_report(salesperson, week_ending, location)
+
+REPORT_RENDERERS = {'pdf': render_pdf, 'xlsx': render_xls}
+
+# Helper: Render one report to bytes (runs in batch worker processes)
+def render_report(fmt, data):
+    return REPORT_RENDERERS[fmt](data)
+
+# Helper: True for a JSON object whose report keys are strings or left out
+def is_report_key(value):
+    return isinstance(value, dict) and all(
+        isinstance(value.get(field), (str, type(None))) for field in ('salesperson', 'weekEnding', 'location'))
+
+# Route: Batch of reports rendered across a process pool, streamed back as a ZIP
+# Body: {"keys": [{"salesperson": ..., "weekEnding": ...}, ...], "formats": ["pdf", "xlsx"]}
+@app.route('/report/batch', methods=['POST'])
+def report_batch():
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        payload = {}
+    keys = payload.get('keys')
+    formats = payload.get('formats') or ['pdf']
+    if (not keys or not isinstance(keys, list) or not all(is_report_key(key) for key in keys)
+            or not isinstance(formats, list) or not all(isinstance(fmt, str) and fmt in REPORT_RENDERERS for fmt in formats)):
+        return 'Expected JSON with "keys" and "formats" (pdf, xlsx).', 400
+    jobs = []
+    names = set()
+    for key in keys:
+        data = find_report(key.get('salesperson'), key.get('weekEnding'))
+        if data is None:
+            return f"No report for {key.get('salesperson')!r} week ending {key.get('weekEnding')!r}.", 404
+        base = safe_filename(f"{data['salesperson']}_{data['weekEnding']}")
+        for fmt in formats:
+            name = f'{base}.{fmt}'
+            n = 2
+            while name in names:
+                name = f'{base}_{n}.{fmt}'
+                n += 1
+            names.add(name)
+            jobs.append((name, (fmt, data)))
+
+    def remember(args, body):
+        output_cache.put(content_key(args[1], args[0]), body)
+
+    return Response(stream_zip(get_executor(), render_report, jobs, on_result=remember), mimetype='application/zip',
+                    headers={'Content-Disposition': 'attachment; filename=sales-activity-reports.zip'})
+
+# Route: XLS, streamed from write-only worksheets (one sheet per salesperson)
+@app.route('/report/xls/stream')
+def report_xls_stream():
+    return Response(load_backend('xlsx').stream_xlsx(iter_reports()), mimetype=XLSX_MIMETYPE,
+                    headers={'Content-Disposition': 'attachment; filename=sales-activity-report-all.xlsx'})
+
+# Helper: Fill the cached RTF template and render it as a plain-text PDF
+def render_rtf_pdf(data):
+    timer = StageTimer()
+    path = report_template_path(data)
+    entry = template_cache.get(path)
+    if entry is None:
+        raise FileNotFoundError(path)
+    timer.lap('template_read')
+    filled = fill_rtf_template(entry.compiled, data)
+    timer.lap('fill')
+    lines = rtf_to_text_lines(filled, tab='    ')
+    timer.lap('convert')
+    return load_backend('pdf').render_text_pdf(lines)
 
 # Route: Download filled RTF report as PDF
 @app.route('/report/rtf')
 def report_rtf_pdf():
-    if not os.path.exists(TEMPLATE_PATH):
+    data = current_report()
+    if data is None:
+        return 'Report not found.', 404
+    try:
+        body = render_rtf_pdf(data)
+    except FileNotFoundError:
         return 'RTF template not found.', 500
-    with open(TEMPLATE_PATH, 'r', encoding='utf-8') as f:
-        template = f.read()
-    filled = fill_rtf_template(template, staticData)
-    # Simple RTF to plain text for demo
-    plain = re.sub(r'\\par', '\n', filled)
-    plain = re.sub(r'\\tab', '\t', plain)
-    plain = re.sub(r'\{\\[^}]+\}', '', plain)
-    plain = re.sub(r'\\[a-z]+[0-9]*', '', plain)
-    plain = re.sub(r'\{\}|\}', '', plain)
-    plain = re.sub(r'\n', '\n', plain)
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    textobject = c.beginText(30, 800)
-    textobject.setFont('Helvetica', 12)
-    for line in plain.split('\n'):
-        textobject.textLine(line)
-    c.drawText(textobject)
-    c.save()
-    buffer.seek(0)
-    return send_file(buffer, as_attachment=True, download_name='sales-activity-report-from-template.pdf', mimetype='application/pdf')
-
-# Route: Display filled RTF report as HTML
+    body, encoding = encode_body(body, negotiate(request.accept_encodings, 'application/pdf'))
+    with stage('send_file'):
+        response = send_file(io.BytesIO(body), as_attachment=True, download_name='sales-activity-report-from-template.pdf', mimetype='application/pdf')
+    set_encoding_headers(response, encoding)
+    return response
+
+# Report formats that can run as background jobs: format -> (renderer, download name, mimetype)
+JOB_FORMATS = {
+    'pdf': (render_pdf, 'sales-activity-report.pdf', 'application/pdf'),
+    'xlsx': (render_xls, 'sales-activity-report.xlsx', XLSX_MIMETYPE),
+    'rtf': (render_rtf_pdf, 'sales-activity-report-from-template.pdf', 'application/pdf'),
+}
+
+# Route: Submit a report render as a background job
+# Body: {"format": "pdf" | "xlsx" | "rtf", "salesperson": ..., "weekEnding": ...}
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    payload = request.get_json(silent=True)
+    if payload is None:
+        payload = {}
+    if not is_report_key(payload):
+        return 'Expected a JSON object; "salesperson", "weekEnding" and "location" must be strings.', 400
+    fmt = payload.get('format', 'pdf')
+    if not isinstance(fmt, str) or fmt not in JOB_FORMATS:
+        return f'Unknown format {fmt!r}; expected one of {", ".join(JOB_FORMATS)}.', 400
+    # Keys left out match any report, latest week first
+    data = find_report(payload.get('salesperson'), payload.get('weekEnding'), payload.get('location'))
+    if data is None:
+        return f"No report for {payload.get('salesperson')!r} week ending {payload.get('weekEnding')!r}.", 404
+    render, download_name, mimetype = JOB_FORMATS[fmt]
+    try:
+        job = job_manager.submit(fmt, render, (data,), download_name, mimetype)
+    except QueueFull as exc:
+        return str(exc), 503
+    return jsonify({**job.to_dict(), 'status_url': url_for('job_status', job_id=job.id),
+                    'download_url': url_for('job_download', job_id=job.id)}), 202
+
+# Route: Job status and progress
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return 'Unknown or expired job.', 404
+    return jsonify(job.to_dict())
+
+# Route: Download a finished job's report
+@app.route('/jobs/<job_id>/download')
+def job_download(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return 'Unknown or expired job.', 404
+    if job.status != 'done':
+        return jsonify(job.to_dict()), 409
+    return send_file(job_manager.result_path(job), as_attachment=True, download_name=job.download_name, mimetype=job.mimetype)
+
+PREVIEW_HEAD = "<!DOCTYPE html><html><head><meta charset='utf-8'><title>RTF Report Preview</title></head><body>"
+PREVIEW_TAIL = "</body></html>"
+
+# Helper: Stream the HTML preview: head first, then body fragments as the template is filled and converted
+def iter_rtf_preview(compiled, data):
+    yield PREVIEW_HEAD
+    with stage('fill_convert'):
+        yield from iter_rtf_html(compiled.iter_render(rtf_context(data)))
+    yield PREVIEW_TAIL
+
+# Route: Display filled RTF report as HTML (streamed, gzip/zstd when accepted)
 @app.route('/report/rtf/html')
 def report_rtf_html():
-    if not os.path.exists(TEMPLATE_PATH):
+    timer = StageTimer()
+    data = current_report()
+    if data is None:
+        return 'Report not found.', 404
+    entry = template_cache.get(report_template_path(data))
+    if entry is None:
         return 'RTF template not found.', 500
-    with open(TEMPLATE_PATH, 'r', encoding='utf-8') as f:
-        template = f.read()
-    filled = fill_rtf_template(template, staticData)
-    html = re.sub(r'\\par', '<br>', filled)
-    html = re.sub(r'\\tab', '&emsp;', html)
-    html = re.sub(r'\{\\[^}]+\}', '', html)
-    html = re.sub(r'\\[a-z]+[0-9]*', '', html)
-    html = re.sub(r'\{\}|\}', '', html)
-    html = re.sub(r'\n', '', html)
-    return f"""<!DOCTYPE html><html><head><meta charset='utf-8'><title>RTF Report Preview</title></head><body>{html}</body></html>"""
+    timer.lap('template_read')
+    # Reads ahead up to MIN_SIZE bytes to decide the encoding, then streams the rest compressed
+    encoding, body = compress_stream(iter_rtf_preview(entry.compiled, data),
+                                     negotiate(request.accept_encodings, 'text/html'))
+    response = Response(stream_with_context(body), mimetype='text/html')
+    set_encoding_headers(response, encoding)
+    return response
+
+# Route: Prometheus metrics (stage latency histograms, byte counts, cache counters)
+@app.route('/metrics')
+def metrics_endpoint():
+    template_stats = template_cache.stats()
+    output_stats = output_cache.stats()
+    extra = {
+        'report_template_cache_hits_total': ('counter', 'Template cache hits.', template_stats['hits']),
+        'report_template_cache_misses_total': ('counter', 'Template cache misses.', template_stats['misses']),
+        'report_output_cache_hits_total': ('counter', 'Rendered output cache hits.', output_stats['hits']),
+        'report_output_cache_misses_total': ('counter', 'Rendered output cache misses.', output_stats['misses']),
+        'report_output_cache_bytes': ('gauge', 'Bytes held in the rendered output cache.', output_stats['bytes']),
+    }
+    return Response(metrics.render(extra), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
     app.run(debug=True) 
\ No newline at end of file
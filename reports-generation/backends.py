@@ -0,0 +1,37 @@
+import importlib
+import os
+
+# Export backends, imported the first time a format needs them: name -> module
+BACKENDS = {
+    'pdf': 'pdf_export',        # ReportLab
+    'xlsx': 'xlsx_export',      # openpyxl
+    'rollup': 'aggregation',    # NumPy
+}
+
+# Comma-separated backend names (or "all") to import at startup, see warm_up()
+WARMUP_ENV = 'REPORT_WARMUP'
+
+
+def load_backend(name):
+    """Return the backend module, importing it on first use (bench_startup.py times these imports)."""
+    return importlib.import_module(BACKENDS[name])
+
+
+def warm_up(names=None):
+    """Import backends ahead of the first request.
+
+    With names=None the REPORT_WARMUP environment variable decides ("pdf,xlsx",
+    "all", or unset for nothing). Preforking servers should call this in the
+    master before workers fork (e.g. gunicorn --preload, where importing app.py
+    runs it) so the imported modules are shared copy-on-write instead of being
+    imported again by every worker.
+    """
+    if names is None:
+        value = os.environ.get(WARMUP_ENV, '').strip()
+        if not value:
+            return []
+        names = list(BACKENDS) if value == 'all' else [n.strip() for n in value.split(',') if n.strip()]
+    for name in names:
+        load_backend(name)
+    return names
+
@@ -0,0 +1,108 @@
+import io
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+# Workers start from a fresh interpreter, never a fork of the threaded server: a forked
+# child could inherit a lock (metrics, caches) held by another request thread and hang
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process pool shared by batch requests, created on first use with one worker per core.
+
+    A pool broken by a dead worker (e.g. OOM-killed) is replaced on the next call.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                            mp_context=multiprocessing.get_context(START_METHOD))
+        return _executor
+
+
+def discard_executor(executor):
+    """Forget the shared pool if it is `executor`, so get_executor() builds a new one."""
+    global _executor
+    with _executor_lock:
+        if _executor is not executor:
+            return
+        _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def safe_filename(name):
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', str(name)).strip('_') or 'report'
+
+
+class _ZipSink(io.RawIOBase):
+    # Unseekable write target: zipfile falls back to data descriptors and we
+    # hand out whatever it has written after each member.
+    def __init__(self):
+        self._buf = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._buf += b
+        return len(b)
+
+    def take(self):
+        data = bytes(self._buf)
+        self._buf.clear()
+        return data
+
+
+def stream_zip(executor, fn, jobs, window=None, on_result=None):
+    """Run fn(*args) for each (arcname, args) job on executor and yield a ZIP archive as they finish.
+
+    At most `window` jobs are in flight so finished results do not pile up in
+    memory when the client reads slower than the workers render. Failed jobs
+    are written to the archive as `<arcname>.error.txt`, as are jobs the
+    executor refuses; a broken shared pool is discarded so the next batch
+    gets a fresh one.
+    """
+    window = window or 2 * (os.cpu_count() or 1)
+    jobs = iter(jobs)
+    sink = _ZipSink()
+    pending = {}
+
+    def fill():
+        for arcname, args in jobs:
+            try:
+                future = executor.submit(fn, *args)
+            except Exception as exc:
+                # e.g. BrokenProcessPool: reported like a failed render instead of cutting the stream off
+                future = Future()
+                future.set_exception(exc)
+            pending[future] = (arcname, args)
+            if len(pending) >= window:
+                break
+
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as zf:
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                arcname, args = pending.pop(future)
+                try:
+                    body = future.result()
+                except Exception as exc:
+                    if isinstance(exc, BrokenProcessPool):
+                        discard_executor(executor)
+                    zf.writestr(arcname + '.error.txt', f'{type(exc).__name__}: {exc}\n')
+                else:
+                    zf.writestr(arcname, body)
+                    if on_result is not None:
+                        on_result(args, body)
+                yield sink.take()
+            fill()
+    yield sink.take()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Benchmark the report routes through Flask's test client at scaled data sizes.
+
+Each (route, scale) case runs in its own child process so the peak RSS it
+reports belongs to that case alone. Results are written as JSON and can be
+compared against a stored baseline:
+
+    python bench_reports.py --output bench-results.json
+    python bench_reports.py --scales 1,100 --baseline bench-results.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROUTES = ['/report/pdf', '/report/xls', '/report/rtf', '/report/rtf/html']
+DEFAULT_SCALES = [1, 100, 10000]
+# Fewer iterations for bigger inputs so a full run stays in minutes
+DEFAULT_ITERATIONS = {1: 50, 100: 5, 10000: 1}
+BASE_DAYS = 7
+
+
+def synthetic_data(scale, seed=0):
+    """staticData-shaped input with BASE_DAYS * scale day rows and derived totals."""
+    import app
+    rng = random.Random(seed)
+    categories = list(app.staticData['categories'])
+    days = []
+    for i in range(BASE_DAYS * scale):
+        values = [rng.randint(0, 150) for _ in categories[:-1]]
+        days.append({'name': f'Day{i:06d}', 'values': values + [sum(values)]})
+    totals = [sum(col) for col in zip(*(d['values'] for d in days))]
+    goal = list(app.staticData['goal'])
+    return {
+        'weekEnding': '2024-01-07',
+        'today': 'Date',
+        'salesperson': 'Bench Rep',
+        'location': 'Location',
+        'days': days,
+        'categories': categories,
+        'totals': totals,
+        'goal': goal,
+        'variance': [t - g for t, g in zip(totals, goal)],
+        'explanation': '',
+    }
+
+
+def synthetic_template(data, source, path):
+    """Repeat the template's day line for every synthetic day so RTF routes scale too."""
+    with open(source, 'r', encoding='utf-8') as f:
+        template = f.read()
+    lines = template.split('\n')
+    day_line = next(line for line in lines if line.startswith('Monday\\tab'))
+    safe_cats = [re.sub(r'[^A-Za-z0-9]', '', cat) for cat in data['categories']]
+    day_lines = [
+        day['name'] + ''.join(f'\\tab ${{day_{day["name"]}_{cat}}}' for cat in safe_cats) + '\\par'
+        for day in data['days']
+    ]
+    out = []
+    for line in lines:
+        if line == day_line:
+            out.extend(day_lines)
+        elif not re.match(r'(Tues|Wednes|Thurs|Fri|Satur|Sun)day\\tab', line):
+            out.append(line)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(out))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def run_case(route, scale, iterations, use_cache, queue):
+    tmpdir = tempfile.mkdtemp(prefix='bench-reports-')
+    os.environ['REPORTS_DB'] = os.path.join(tmpdir, 'reports.db')
+    import app
+    data = synthetic_data(scale)
+    app.report_store.save_report(data)
+    route = f"{route}?salesperson={data['salesperson']}&weekEnding={data['weekEnding']}"
+    path = os.path.join(tmpdir, 'template.rtf')
+    synthetic_template(data, app.TEMPLATE_PATH, path)
+    app.TEMPLATE_PATH = path
+    client = app.app.test_client()
+    client.get(route)  # warm-up: imports, template cache, font metrics
+    latencies = []
+    nbytes = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if not use_cache:
+            app.output_cache.clear()
+        t0 = time.perf_counter()
+        response = client.get(route)
+        body = response.get_data()
+        latencies.append(time.perf_counter() - t0)
+        if response.status_code != 200:
+            raise RuntimeError(f'{route} returned {response.status_code}')
+        nbytes = len(body)
+    wall = time.perf_counter() - start
+    app.report_store.pool.close()
+    shutil.rmtree(tmpdir)
+    queue.put({
+        'route': route.split('?')[0],
+        'scale': scale,
+        'rows': len(data['days']),
+        'iterations': iterations,
+        'throughput_rps': iterations / wall,
+        'latency_ms': {
+            'mean': statistics.mean(latencies) * 1000,
+            'p50': percentile(latencies, 50) * 1000,
+            'p90': percentile(latencies, 90) * 1000,
+            'p99': percentile(latencies, 99) * 1000,
+            'max': max(latencies) * 1000,
+        },
+        'bytes': nbytes,
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == 'darwin' else 1),
+    })
+
+
+def run(routes, scales, iterations=None, use_cache=False):
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for scale in scales:
+        n = iterations or DEFAULT_ITERATIONS.get(scale, 1)
+        for route in routes:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=run_case, args=(route, scale, n, use_cache, queue))
+            proc.start()
+            proc.join()
+            if proc.exitcode != 0:
+                print(f'{route} x{scale}: failed (exit {proc.exitcode})', file=sys.stderr)
+                continue
+            result = queue.get()
+            results.append(result)
+            lat = result['latency_ms']
+            print(f"{route:<18} x{scale:<6} {result['throughput_rps']:9.2f} req/s  p50 {lat['p50']:9.2f} ms  "
+                  f"p99 {lat['p99']:9.2f} ms  rss {result['peak_rss_kb'] / 1024:7.1f} MiB")
+    return results
+
+
+def compare(results, baseline, max_regression):
+    """Print p50 latency changes against a baseline; return the cases that regressed."""
+    base = {(r['route'], r['scale']): r for r in baseline['results']}
+    regressions = []
+    for r in results:
+        b = base.get((r['route'], r['scale']))
+        if b is None:
+            continue
+        change = r['latency_ms']['p50'] / b['latency_ms']['p50'] - 1
+        print(f"{r['route']:<18} x{r['scale']:<6} p50 {b['latency_ms']['p50']:9.2f} -> {r['latency_ms']['p50']:9.2f} ms "
+              f"({change:+.1%})")
+        if change > max_regression:
+            regressions.append((r['route'], r['scale'], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the report routes at scaled data sizes.')
+    parser.add_argument('--routes', default=','.join(ROUTES))
+    parser.add_argument('--scales', default=','.join(map(str, DEFAULT_SCALES)))
+    parser.add_argument('--iterations', type=int, help='requests per case (default depends on scale)')
+    parser.add_argument('--cache', action='store_true', help='leave the output cache on between requests')
+    parser.add_argument('--output', default='bench-results.json')
+    parser.add_argument('--baseline', help='results JSON to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='allowed p50 slowdown vs baseline (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    # app.py resolves template.rtf relative to the working directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    results = run(args.routes.split(','), [int(s) for s in args.scales.split(',')], args.iterations, args.cache)
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'cache': args.cache,
+        },
+        'results': results,
+    }
+    if baseline_path:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f'Wrote {output}')
+    if baseline_path:
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            for route, scale, change in regressions:
+                print(f'REGRESSION {route} x{scale}: p50 {change:+.1%}', file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
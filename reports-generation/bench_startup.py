@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Measure report service cold-start cost from `python -X importtime` output.
+
+Each target (the app itself and every lazily loaded export backend) is
+imported in a fresh interpreter; the cumulative time of its top-level import
+is reported along with the slowest modules it pulled in. Run it repeatedly
+and the median is kept, since a single cold import is noisy:
+
+    python bench_startup.py
+    python bench_startup.py --repeat 9 --top 10 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from backends import BACKENDS
+
+# "import time: self [us] | cumulative | imported package" lines on stderr
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+def parse_importtime(stderr):
+    """Return [(module, self_us, cumulative_us, depth)] from -X importtime output."""
+    entries = []
+    for line in stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if m:
+            # Nesting is shown as two spaces of indent per level after the first
+            depth = (len(m.group(3)) - 1) // 2
+            entries.append((m.group(4), int(m.group(1)), int(m.group(2)), depth))
+    return entries
+
+
+def measure(statement, baseline=()):
+    """Import in a clean interpreter; returns the parsed entries for modules not in baseline."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    env.pop('REPORT_WARMUP', None)
+    preload = ''.join(f'import {name}; ' for name in baseline)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', preload + statement],
+                          capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        raise RuntimeError(f'{statement!r} failed:\n{proc.stderr[-2000:]}')
+    entries = parse_importtime(proc.stderr)
+    if baseline:
+        # Drop everything imported while loading the baseline modules
+        last = max(i for i, (name, _, _, depth) in enumerate(entries) if depth == 0 and name in baseline)
+        entries = entries[last + 1:]
+    return entries
+
+
+def summarize(entries, module, top):
+    cumulative = sum(cum for name, _, cum, depth in entries if depth == 0)
+    slowest = sorted(entries, key=lambda e: e[1], reverse=True)[:top]
+    return {
+        'module': module,
+        'cumulative_ms': cumulative / 1000,
+        'modules': len(entries),
+        'slowest_self_ms': [{'module': name, 'ms': self_us / 1000} for name, self_us, _, _ in slowest],
+    }
+
+
+def run(repeat, top):
+    # The app without any backend first, then each backend on top of an already imported app
+    targets = [('app', 'import app', ())]
+    targets += [(name, f'import {module}', ('app',)) for name, module in BACKENDS.items()]
+    results = []
+    for name, statement, baseline in targets:
+        runs = [measure(statement, baseline) for _ in range(repeat)]
+        summaries = [summarize(entries, statement.split()[-1], top) for entries in runs]
+        median = statistics.median(s['cumulative_ms'] for s in summaries)
+        result = min(summaries, key=lambda s: abs(s['cumulative_ms'] - median))
+        result['target'] = name
+        result['runs_ms'] = [s['cumulative_ms'] for s in summaries]
+        results.append(result)
+        print(f"{name:<8} {result['cumulative_ms']:9.1f} ms  {result['modules']:5d} modules  "
+              f"slowest: {', '.join(s['module'] for s in result['slowest_self_ms'][:3])}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report import time of the app and each export backend.')
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per target (median is kept)')
+    parser.add_argument('--top', type=int, default=5, help='slowest modules to list per target')
+    parser.add_argument('--output', help='write results as JSON')
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output) if args.output else None
+    # app.py opens reports.db and template.rtf relative to the working directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    results = run(args.repeat, args.top)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=2)
+        print(f'Wrote {output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = '.invoice-manifest.json'
+MANIFEST_VERSION = 1
+
+
+def data_hash(value):
+    """Stable hash of a JSON subtree (key order does not matter)."""
+    payload = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class BuildManifest:
+    """Record of the inputs each output in a directory was built from.
+
+    Stored as MANIFEST_NAME next to the outputs: for every output file name,
+    the hash of its data subtree, the template hash and the renderer version.
+    An output is current when all three match and the file still exists.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.entries = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        # An unreadable or older manifest means a full rebuild, never a wrong skip
+        if isinstance(stored, dict) and stored.get('version') == MANIFEST_VERSION:
+            self.entries = stored.get('outputs', {})
+
+    @staticmethod
+    def entry(data, template_hash, renderer):
+        return {'data': data_hash(data), 'template': template_hash or '', 'renderer': renderer}
+
+    def is_current(self, name, entry):
+        return self.entries.get(name) == entry and os.path.exists(os.path.join(self.output_dir, name))
+
+    def record(self, name, entry):
+        self.entries[name] = entry
+
+    def forget(self, name):
+        self.entries.pop(name, None)
+
+    def remove_orphans(self, names):
+        """Delete outputs recorded by an earlier build that the current inputs no longer produce."""
+        keep = set(names)
+        removed = []
+        for name in [n for n in self.entries if n not in keep]:
+            try:
+                os.remove(os.path.join(self.output_dir, name))
+            except FileNotFoundError:
+                pass
+            del self.entries[name]
+            removed.append(name)
+        return removed
+
+    def save(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'outputs': self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
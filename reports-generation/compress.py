@@ -0,0 +1,106 @@
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd is only offered when the zstandard package is installed
+    zstandard = None
+
+# Bodies smaller than this go out uncompressed; the framing would eat the saving
+MIN_SIZE = 1024
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# XLSX (already a zip) and other packed formats gain nothing from a second pass
+COMPRESSIBLE_TYPES = ('text/', 'application/pdf', 'application/rtf', 'application/json')
+
+# Suffix added to a cache key / ETag for each encoded variant
+VARIANT_SUFFIX = {'gzip': '-gz', 'zstd': '-zst'}
+
+
+def available_encodings():
+    """Encodings this server can produce, most preferred first."""
+    return ['zstd', 'gzip'] if zstandard is not None else ['gzip']
+
+
+def is_compressible(mimetype):
+    return mimetype is not None and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def negotiate(accept_encodings, mimetype):
+    """Pick a Content-Encoding from the request's parsed Accept-Encoding, or None for identity."""
+    if not is_compressible(mimetype):
+        return None
+    return accept_encodings.best_match(available_encodings())
+
+
+def variant_key(key, encoding):
+    return key if encoding is None else key + VARIANT_SUFFIX[encoding]
+
+
+def _compressor(encoding):
+    if encoding == 'gzip':
+        # wbits=31: zlib stream with a gzip header and trailer
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    raise ValueError(f'Unsupported encoding {encoding!r}')
+
+
+def compress_bytes(body, encoding):
+    compressor = _compressor(encoding)
+    return compressor.compress(body) + compressor.flush()
+
+
+def _sync_flush(compressor, encoding):
+    if encoding == 'gzip':
+        return compressor.flush(zlib.Z_SYNC_FLUSH)
+    return compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+
+def _as_bytes(chunk):
+    return chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+
+def iter_compress(chunks, encoding):
+    """Compress an iterable of str/bytes chunks, yielding output as each input chunk is flushed.
+
+    Every chunk is sync-flushed so a streamed page still renders progressively
+    in the browser instead of arriving when the compressor's window fills.
+    """
+    compressor = _compressor(encoding)
+    for chunk in chunks:
+        chunk = _as_bytes(chunk)
+        if not chunk:
+            continue
+        out = compressor.compress(chunk) + _sync_flush(compressor, encoding)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def compress_stream(chunks, encoding, min_size=MIN_SIZE):
+    """Decide on compression for a stream of unknown length.
+
+    Reads ahead until min_size bytes are buffered or the stream ends, then
+    returns (encoding, body iterator). Short streams come back as
+    (None, buffered chunks) so they are sent as they are.
+    """
+    chunks = iter(chunks)
+    if encoding is None:
+        return None, chunks
+    head = []
+    size = 0
+    for chunk in chunks:
+        chunk = _as_bytes(chunk)
+        head.append(chunk)
+        size += len(chunk)
+        if size >= min_size:
+            break
+    else:
+        return None, iter(head)
+
+    def body():
+        yield from head
+        yield from chunks
+
+    return encoding, iter_compress(body(), encoding)
@@ -0,0 +1,348 @@
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    import pypandoc
+    HAS_PYPANDOC = True
+except ImportError:
+    HAS_PYPANDOC = False
+
+try:
+    from docx2pdf import convert as docx2pdf_convert
+    HAS_DOCX2PDF = True
+except ImportError:
+    HAS_DOCX2PDF = False
+
+try:
+    # LibreOffice's Python bridge, used to keep one office instance running per worker
+    import uno
+    from com.sun.star.beans import PropertyValue
+    from com.sun.star.connection import NoConnectException
+    HAS_UNO = True
+except ImportError:
+    HAS_UNO = False
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_MAX_PENDING = 256
+# Seconds allowed per document; a batch of n documents gets n times this
+DEFAULT_TIMEOUT = 60
+# Seconds a worker waits for more documents before converting a partial batch
+BATCH_WAIT = 0.2
+# Seconds allowed for a resident LibreOffice to start accepting connections
+OFFICE_START_TIMEOUT = 60
+
+CONVERTERS = ('soffice', 'docx2pdf', 'pandoc')
+
+
+class QueueFull(Exception):
+    pass
+
+
+def soffice_binary():
+    return shutil.which('soffice') or shutil.which('libreoffice')
+
+
+def available_converters():
+    """Converters usable here, best batching first."""
+    found = []
+    if soffice_binary():
+        found.append('soffice')
+    if HAS_PYPANDOC and HAS_DOCX2PDF:
+        found.append('docx2pdf')
+    if HAS_PYPANDOC:
+        found.append('pandoc')
+    return found
+
+
+def _file_url(path):
+    return uno.systemPathToFileUrl(os.path.abspath(path))
+
+
+def _properties(**values):
+    props = []
+    for name, value in values.items():
+        prop = PropertyValue()
+        prop.Name = name
+        prop.Value = value
+        props.append(prop)
+    return tuple(props)
+
+
+class _Office:
+    """A headless LibreOffice kept running for one worker's lifetime, driven over a UNO pipe.
+
+    Started on first use and restarted after it exits or is killed for a
+    timeout, so LibreOffice startup is paid once per worker, not per document.
+    """
+
+    def __init__(self, profile, pipe):
+        self.profile = profile
+        self.pipe = pipe
+        self.process = None
+        self.desktop = None
+
+    def _start(self):
+        self.stop()
+        self.process = subprocess.Popen(
+            [soffice_binary(), f'-env:UserInstallation=file://{self.profile}', '--headless', '--invisible',
+             '--nologo', '--nodefault', '--norestore', f'--accept=pipe,name={self.pipe};urp;StarOffice.ComponentContext'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext('com.sun.star.bridge.UnoUrlResolver', local)
+        deadline = time.monotonic() + OFFICE_START_TIMEOUT
+        while True:
+            try:
+                context = resolver.resolve(f'uno:pipe,name={self.pipe};urp;StarOffice.ComponentContext')
+                break
+            except NoConnectException:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError('LibreOffice listener did not start') from None
+                time.sleep(0.1)
+        self.desktop = context.ServiceManager.createInstanceWithContext('com.sun.star.frame.Desktop', context)
+
+    def convert(self, rtf_path, output_pdf, timeout):
+        if self.desktop is None or self.process.poll() is not None:
+            self._start()
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            self.process.kill()
+
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        try:
+            doc = self.desktop.loadComponentFromURL(_file_url(rtf_path), '_blank', 0, _properties(Hidden=True))
+            if doc is None:
+                raise RuntimeError(f'LibreOffice could not load {rtf_path}')
+            try:
+                doc.storeToURL(_file_url(output_pdf), _properties(FilterName='writer_pdf_Export'))
+            finally:
+                doc.close(True)
+        except Exception:
+            if timed_out.is_set():
+                # The instance was killed mid-document; the next document starts a fresh one
+                raise TimeoutError(f'conversion exceeded {timeout}s') from None
+            raise
+        finally:
+            timer.cancel()
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.desktop is not None and self.process.poll() is None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+        self.desktop = None
+
+
+class _Job:
+    __slots__ = ('rtf_path', 'output_pdf', 'remove_input', 'future')
+
+    def __init__(self, rtf_path, output_pdf, remove_input):
+        self.rtf_path = rtf_path
+        self.output_pdf = output_pdf
+        self.remove_input = remove_input
+        self.future = Future()
+
+
+class ConverterPool:
+    """RTF -> PDF conversion workers fed from a bounded queue.
+
+    - soffice with LibreOffice's Python bridge (uno) installed: every worker
+      keeps one headless LibreOffice listening on its own pipe and profile for
+      its lifetime and converts documents through it one at a time, so
+      LibreOffice starts once per worker rather than once per document.
+    - soffice without uno: each worker takes up to batch_size queued documents
+      and converts them with one LibreOffice run, so startup is paid once per
+      batch; the worker's profile is kept between runs.
+    - docx2pdf: pandoc RTF -> DOCX per document, then one docx2pdf run over
+      each batch directory.
+    - pandoc: pandoc has no resident or multi-output mode, so every document
+      is still one pandoc process; the pool only bounds and parallelizes them.
+
+    submit() blocks while max_pending documents are waiting (back-pressure)
+    and returns a Future for the output path. A conversion that exceeds its
+    per-document timeout is killed and fails with TimeoutError; a worker
+    always resolves the futures of the documents it took, whatever fails.
+    """
+
+    def __init__(self, converter=None, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE,
+                 max_pending=DEFAULT_MAX_PENDING, timeout=DEFAULT_TIMEOUT):
+        available = available_converters()
+        if converter is None:
+            if not available:
+                raise RuntimeError('No supported RTF to PDF converter found. Please install LibreOffice, pypandoc or docx2pdf.')
+            converter = available[0]
+        elif converter not in available:
+            raise RuntimeError(f'RTF converter {converter!r} is not available here')
+        self.converter = converter
+        self.resident = converter == 'soffice' and HAS_UNO
+        # A resident office converts one document at a time, so hand them out singly to spread the load
+        self.batch_size = 1 if self.resident else batch_size
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._workdir = tempfile.mkdtemp(prefix='rtf-convert-')
+        self._closed = False
+        self._threads = [threading.Thread(target=self._run, args=(i,), name=f'rtf-convert-{i}', daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, rtf_path, output_pdf, remove_input=False, block=True, timeout=None):
+        """Queue one conversion; waits while the queue is full unless block=False or timeout expires."""
+        if self._closed:
+            raise RuntimeError('ConverterPool is closed')
+        job = _Job(rtf_path, output_pdf, remove_input)
+        try:
+            self._queue.put(job, block=block, timeout=timeout)
+        except queue.Full:
+            raise QueueFull(f'{self._queue.maxsize} conversions already waiting') from None
+        return job.future
+
+    def close(self):
+        """Finish queued conversions, stop the workers (and their offices) and remove profiles and scratch files."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        shutil.rmtree(self._workdir, ignore_errors=True)
+
+    def _run(self, index):
+        profile = os.path.join(self._workdir, f'profile-{index}')
+        office = _Office(profile, f'{os.path.basename(self._workdir)}-{index}') if self.resident else None
+        stop = False
+        try:
+            while not stop:
+                job = self._queue.get()
+                if job is None:
+                    break
+                batch = [job]
+                deadline = time.monotonic() + BATCH_WAIT
+                while len(batch) < self.batch_size:
+                    try:
+                        job = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if job is None:
+                        stop = True
+                        break
+                    batch.append(job)
+                self._convert_batch(profile, office, batch)
+        finally:
+            if office is not None:
+                office.stop()
+
+    def _convert_batch(self, profile, office, batch):
+        batch_dir = None
+        try:
+            batch_dir = tempfile.mkdtemp(dir=self._workdir, prefix='batch-')
+            in_dir = os.path.join(batch_dir, 'in')
+            out_dir = os.path.join(batch_dir, 'out')
+            os.makedirs(in_dir)
+            os.makedirs(out_dir)
+            inputs = []
+            for n, job in enumerate(batch):
+                path = os.path.join(in_dir, f'{n}.rtf')
+                try:
+                    os.link(job.rtf_path, path)
+                except OSError:
+                    shutil.copyfile(job.rtf_path, path)
+                inputs.append(path)
+            errors = {}
+            try:
+                errors = getattr(self, f'_convert_{self.converter}')(profile, office, inputs, out_dir)
+            except subprocess.TimeoutExpired:
+                error = TimeoutError(f'conversion batch exceeded {self.timeout}s per document')
+            except Exception as exc:
+                error = exc
+            else:
+                error = RuntimeError('converter produced no output')
+            for n, job in enumerate(batch):
+                produced = os.path.join(out_dir, f'{n}.pdf')
+                if os.path.exists(produced):
+                    # The scratch dir is under TMPDIR, often another filesystem than the output
+                    shutil.move(produced, job.output_pdf)
+                    job.future.set_result(job.output_pdf)
+                else:
+                    job.future.set_exception(errors.get(n, error))
+        except Exception as exc:
+            # Scratch space, staging or moving failed: fail what is left rather than leave futures pending
+            for job in batch:
+                if not job.future.done():
+                    job.future.set_exception(exc)
+        finally:
+            for job in batch:
+                if job.remove_input:
+                    try:
+                        os.remove(job.rtf_path)
+                    except OSError:
+                        pass
+            if batch_dir is not None:
+                shutil.rmtree(batch_dir, ignore_errors=True)
+
+    def _convert_soffice(self, profile, office, inputs, out_dir):
+        if office is not None:
+            errors = {}
+            for n, path in enumerate(inputs):
+                try:
+                    office.convert(path, os.path.join(out_dir, f'{n}.pdf'), self.timeout)
+                except Exception as exc:
+                    errors[n] = exc
+            return errors
+        subprocess.run(
+            [soffice_binary(), f'-env:UserInstallation=file://{profile}', '--headless', '--norestore',
+             '--convert-to', 'pdf', '--outdir', out_dir, *inputs],
+            check=True, capture_output=True, timeout=self.timeout * len(inputs))
+        return {}
+
+    def _convert_docx2pdf(self, profile, office, inputs, out_dir):
+        docx_dir = os.path.join(os.path.dirname(out_dir), 'docx')
+        os.makedirs(docx_dir)
+        errors = {}
+        for n, path in enumerate(inputs):
+            try:
+                pypandoc.convert_file(path, 'docx', outputfile=os.path.join(docx_dir, f'{n}.docx'))
+            except Exception as exc:
+                errors[n] = exc
+        if len(errors) < len(inputs):
+            docx2pdf_convert(docx_dir, out_dir)
+        return errors
+
+    def _convert_pandoc(self, profile, office, inputs, out_dir):
+        pandoc = pypandoc.get_pandoc_path()
+        errors = {}
+        for n, path in enumerate(inputs):
+            try:
+                subprocess.run([pandoc, path, '-o', os.path.join(out_dir, f'{n}.pdf')],
+                               check=True, capture_output=True, timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                errors[n] = TimeoutError(f'conversion exceeded {self.timeout}s')
+            except Exception as exc:
+                errors[n] = exc
+        return errors
@@ -0,0 +1,282 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+
+DEFAULT_POOL_SIZE = 4
+TOTAL_LABEL = 'TOTAL'
+# Accepted weekEnding spellings; stored as the first, so text order is date order
+WEEK_FORMATS = ('%Y-%m-%d', '%m/%d/%Y')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS categories (
+    position INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reports (
+    salesperson TEXT NOT NULL,
+    week_ending TEXT NOT NULL,
+    location TEXT NOT NULL,
+    today TEXT NOT NULL DEFAULT '',
+    explanation TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (salesperson, week_ending, location)
+);
+CREATE TABLE IF NOT EXISTS activity (
+    salesperson TEXT NOT NULL,
+    week_ending TEXT NOT NULL,
+    location TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    day_name TEXT NOT NULL,
+    category INTEGER NOT NULL REFERENCES categories (position),
+    value NUMERIC NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS activity_report_idx ON activity (salesperson, week_ending, location);
+CREATE INDEX IF NOT EXISTS reports_location_idx ON reports (location, week_ending);
+CREATE TABLE IF NOT EXISTS goals (
+    salesperson TEXT NOT NULL,
+    week_ending TEXT NOT NULL,
+    location TEXT NOT NULL,
+    category INTEGER NOT NULL REFERENCES categories (position),
+    goal NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (salesperson, week_ending, location, category)
+);
+-- Bumped by every save, so in-memory copies can tell whether the store changed under them
+CREATE TABLE IF NOT EXISTS revision (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO revision VALUES (0, 0);
+'''
+
+# Day rows with their per-day TOTAL computed by a window function
+DAYS_SQL = '''
+SELECT day, day_name, category, value, SUM(value) OVER (PARTITION BY day)
+FROM activity
+WHERE salesperson = ? AND week_ending = ? AND location = ?
+ORDER BY day, category
+'''
+
+# Per-category totals, goal and variance, followed by the grand-total row
+TOTALS_SQL = '''
+WITH per_category AS (
+    SELECT c.position AS position, COALESCE(t.total, 0) AS total, COALESCE(g.goal, 0) AS goal
+    FROM categories c
+    LEFT JOIN (
+        SELECT category, SUM(value) AS total
+        FROM activity
+        WHERE salesperson = :salesperson AND week_ending = :week_ending AND location = :location
+        GROUP BY category
+    ) t ON t.category = c.position
+    LEFT JOIN goals g
+        ON g.category = c.position AND g.salesperson = :salesperson
+        AND g.week_ending = :week_ending AND g.location = :location
+)
+SELECT 0 AS grand, position, total, goal, total - goal FROM per_category
+UNION ALL
+SELECT 1, NULL, SUM(total), SUM(goal), SUM(total) - SUM(goal) FROM per_category
+ORDER BY grand, position
+'''
+
+
+def iso_date(value):
+    """weekEnding as 'YYYY-MM-DD', from a date or an ISO or MM/DD/YYYY string; ValueError otherwise."""
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, str):
+        for fmt in WEEK_FORMATS:
+            try:
+                return datetime.strptime(value.strip(), fmt).date().isoformat()
+            except ValueError:
+                pass
+    raise ValueError(f'Invalid weekEnding {value!r}; expected YYYY-MM-DD')
+
+
+class ConnectionPool:
+    """Small pool of SQLite connections shared across Flask threads."""
+
+    def __init__(self, path, size=DEFAULT_POOL_SIZE, timeout=30):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=self.timeout)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            conn = self._connect() if create else self._idle.get(timeout=self.timeout)
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class ReportStore:
+    """Weekly sales activity reports in SQLite, returned in the staticData dict shape."""
+
+    def __init__(self, path, pool_size=DEFAULT_POOL_SIZE):
+        self.pool = ConnectionPool(path, pool_size)
+        self._save_listeners = []
+
+    def add_save_listener(self, listener):
+        """Call listener(revision, key, categories, days, goal) after each save_report().
+
+        key is (salesperson, week_ending, location), days a list of (name,
+        values) and goal the goal values, all cut to the stored categories;
+        revision is the store revision the save produced.
+        """
+        self._save_listeners.append(listener)
+
+    def revision(self):
+        with self.pool.connection() as conn:
+            return conn.execute('SELECT value FROM revision').fetchone()[0]
+
+    def init_schema(self):
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def is_empty(self):
+        with self.pool.connection() as conn:
+            return conn.execute('SELECT 1 FROM reports LIMIT 1').fetchone() is None
+
+    def save_report(self, data):
+        """Insert or replace one report given in the staticData shape (last category is the TOTAL column).
+
+        weekEnding is stored as an ISO date (see iso_date), which is what
+        get_report's latest-week ordering and the monthly rollups rely on.
+        """
+        key = (data['salesperson'], iso_date(data['weekEnding']), data['location'])
+        categories = [c for c in data['categories'] if c != TOTAL_LABEL]
+        with self.pool.connection() as conn, conn:
+            conn.executemany('INSERT OR REPLACE INTO categories (position, name) VALUES (?, ?)', enumerate(categories))
+            conn.execute('DELETE FROM activity WHERE salesperson = ? AND week_ending = ? AND location = ?', key)
+            conn.execute('DELETE FROM goals WHERE salesperson = ? AND week_ending = ? AND location = ?', key)
+            conn.execute('INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?)',
+                         key + (data.get('today', ''), data.get('explanation', '')))
+            conn.executemany(
+                'INSERT INTO activity VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key + (d, day['name'], i, value)
+                 for d, day in enumerate(data['days'])
+                 for i, value in enumerate(day['values'][:len(categories)])))
+            conn.executemany('INSERT INTO goals VALUES (?, ?, ?, ?, ?)',
+                             (key + (i, goal) for i, goal in enumerate(data['goal'][:len(categories)])))
+            conn.execute('UPDATE revision SET value = value + 1')
+            revision = conn.execute('SELECT value FROM revision').fetchone()[0]
+        days = [(day['name'], day['values'][:len(categories)]) for day in data['days']]
+        for listener in self._save_listeners:
+            listener(revision, key, categories, days, data['goal'][:len(categories)])
+
+    def _report(self, conn, header):
+        salesperson, week_ending, location, today, explanation = header
+        key = (salesperson, week_ending, location)
+        rows = conn.execute('SELECT position, name FROM categories ORDER BY position').fetchall()
+        categories = [name for _, name in rows]
+        positions = {position: i for i, (position, _) in enumerate(rows)}
+        days = []
+        current = None
+        for day, day_name, category, value, day_total in conn.execute(DAYS_SQL, key):
+            if current is None or current[0] != day:
+                values = [0] * (len(categories) + 1)
+                values[-1] = day_total
+                current = (day, {'name': day_name, 'values': values})
+                days.append(current[1])
+            current[1]['values'][positions[category]] = value
+        totals, goal, variance = [], [], []
+        params = {'salesperson': salesperson, 'week_ending': week_ending, 'location': location}
+        for _, _, total, goal_value, diff in conn.execute(TOTALS_SQL, params):
+            totals.append(total or 0)
+            goal.append(goal_value or 0)
+            variance.append(diff or 0)
+        return {
+            'weekEnding': week_ending,
+            'today': today,
+            'salesperson': salesperson,
+            'location': location,
+            'days': days,
+            'categories': categories + [TOTAL_LABEL],
+            'totals': totals,
+            'goal': goal,
+            'variance': variance,
+            'explanation': explanation,
+        }
+
+    def get_report(self, salesperson=None, week_ending=None, location=None):
+        """The report matching the given keys; keys left as None match any, and the latest week wins."""
+        if week_ending is not None:
+            try:
+                week_ending = iso_date(week_ending)
+            except ValueError:
+                return None
+        clauses, params = [], []
+        for column, value in (('salesperson', salesperson), ('week_ending', week_ending), ('location', location)):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        sql = 'SELECT * FROM reports'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        with self.pool.connection() as conn:
+            header = conn.execute(sql + ' ORDER BY week_ending DESC, salesperson, location LIMIT 1', params).fetchone()
+            return None if header is None else self._report(conn, header)
+
+    def latest_report(self):
+        return self.get_report()
+
+    def iter_reports(self):
+        """All reports ordered by salesperson then week, fetched one at a time."""
+        with self.pool.connection() as conn:
+            headers = conn.execute('SELECT * FROM reports ORDER BY salesperson, week_ending, location').fetchall()
+        for header in headers:
+            with self.pool.connection() as conn:
+                yield self._report(conn, header)
+
+    def categories(self):
+        with self.pool.connection() as conn:
+            return [name for (name,) in conn.execute('SELECT name FROM categories ORDER BY position')]
+
+    def _filtered(self, sql, order, salesperson, location):
+        clauses, params = [], []
+        if salesperson is not None:
+            clauses.append('salesperson = ?')
+            params.append(salesperson)
+        if location is not None:
+            clauses.append('location = ?')
+            params.append(location)
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        with self.pool.connection() as conn:
+            return conn.execute(sql + ' ORDER BY ' + order, params).fetchall()
+
+    def activity_rows(self, salesperson=None, location=None):
+        """Raw daily activity rows, ordered so each day's categories are adjacent."""
+        return self._filtered(
+            'SELECT salesperson, location, week_ending, day, day_name, category, value FROM activity',
+            'salesperson, location, week_ending, day, category', salesperson, location)
+
+    def goal_rows(self, salesperson=None, location=None):
+        return self._filtered(
+            'SELECT salesperson, location, week_ending, category, goal FROM goals',
+            'salesperson, location, week_ending, category', salesperson, location)
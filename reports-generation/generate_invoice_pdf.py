@@ -1,7 +1,11 @@
+import argparse
 import json
-import re
 import os
+import shutil
+import sys
 import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 from pathlib import Path
 
@@ -17,7 +21,14 @@ try:
 except ImportError:
     HAS_DOCX2PDF = False
 
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator, Optional
+
+from batch import safe_filename
+from invoice_template import CompiledTemplate, Context, compile_template, template_hash
+from build_manifest import BuildManifest
+from invoice_reader import iter_invoices
+from invoice_calc import InvoiceTotals, LineItems, compute_invoice, format_cents
+from converter_pool import CONVERTERS, DEFAULT_BATCH_SIZE, DEFAULT_TIMEOUT, DEFAULT_WORKERS, ConverterPool
 
 def load_json(path: str) -> Any:
     with open(path, 'r', encoding='utf-8') as f:
@@ -27,77 +38,303 @@ def load_rtf(path: str) -> str:
     with open(path, 'r', encoding='utf-8') as f:
         return f.read()
 
-def fill_placeholders(template: str, context: Dict[str, Any]) -> str:
-    # Replace $placeholders in the template with context values
-    def replacer(match):
-        key = match.group(1)
-        return str(context.get(key, match.group(0)))
-    return re.sub(r'\$(\w+)', replacer, template)
-
-def process_foreach(template: str) -> str:
-    # Regex to match @foreach(collection as alias) ... @end-foreach
-    foreach_regex = re.compile(r'@foreach\((\w+)(?:\s+as\s+(\w+))?\)([\s\S]*?)@end-foreach', re.MULTILINE)
-    
-    def foreach_replacer(match):
-        collection_name = match.group(1)
-        alias = match.group(2) or 'd'  # default alias is 'd' if not provided
-        block = match.group(3)
-        # Load data.json to get the collection
-        with open('data.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        # Find the collection in the first invoice
-        collection = data['invoices'][0].get(collection_name, [])
-        rendered = ''
-        for item in collection:
-            # Support nested attribute access: ${alias.key} or ${alias.key.subkey}
-            def item_replacer(m):
-                expr = m.group(1)
-                if not expr.startswith(alias + "."):
-                    return m.group(0)
-                keys = expr[len(alias)+1:].split('.')
-                val = item
-                for k in keys:
-                    if isinstance(val, dict):
-                        val = val.get(k, m.group(0))
-                    else:
-                        return m.group(0)
-                return str(val)
-            rendered += re.sub(r'\$\{(' + re.escape(alias) + r'(?:\.[^}]+)?)\}', item_replacer, block)
-        return rendered
-    # Replace all foreach blocks
-    return foreach_regex.sub(foreach_replacer, template)
+def as_compiled(template) -> CompiledTemplate:
+    # template may be source text (compiled once per distinct content) or a CompiledTemplate
+    return template if isinstance(template, CompiledTemplate) else compile_template(template)
 
-def rtf_to_pdf(rtf_content: str, output_pdf: str):
-    # Save RTF to a temp file
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.rtf', mode='w', encoding='utf-8') as tmp_rtf:
-        tmp_rtf.write(rtf_content)
-        tmp_rtf_path = tmp_rtf.name
+def render_template(template, context) -> str:
+    return as_compiled(template).render(context)
+
+def rtf_file_to_pdf(rtf_path: str, output_pdf: str):
     # Try pypandoc first
     if HAS_PYPANDOC:
-        pypandoc.convert_file(tmp_rtf_path, 'pdf', outputfile=output_pdf)
+        pypandoc.convert_file(rtf_path, 'pdf', outputfile=output_pdf)
     elif HAS_DOCX2PDF:
         # Convert RTF to DOCX using pypandoc, then DOCX to PDF
-        tmp_docx = tmp_rtf_path.replace('.rtf', '.docx')
-        pypandoc.convert_file(tmp_rtf_path, 'docx', outputfile=tmp_docx)
-        docx2pdf_convert(tmp_docx, output_pdf)
-        os.remove(tmp_docx)
+        tmp_docx = rtf_path.replace('.rtf', '.docx')
+        pypandoc.convert_file(rtf_path, 'docx', outputfile=tmp_docx)
+        try:
+            docx2pdf_convert(tmp_docx, output_pdf)
+        finally:
+            os.remove(tmp_docx)
     else:
         raise RuntimeError('No supported RTF to PDF converter found. Please install pypandoc or docx2pdf.')
-    os.remove(tmp_rtf_path)
-
-def main():
-    data = load_json('data.json')
-    template = load_rtf('template2.rtf')
-    invoice = data['invoices'][0]  # Just use the first invoice for this example
-    # Fill header placeholders
-    context = invoice['header']
-    filled = fill_placeholders(template, context)
-    # Process @foreach for details and aliases
-    filled = process_foreach(filled)
-    # Output PDF
-    output_pdf = 'invoice_output.pdf'
-    rtf_to_pdf(filled, output_pdf)
-    print(f'Generated PDF: {output_pdf}')
+
+def rtf_to_pdf(rtf_content: str, output_pdf: str):
+    # Save RTF to a temp file
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.rtf', mode='w', encoding='utf-8') as tmp_rtf:
+        tmp_rtf.write(rtf_content)
+    try:
+        rtf_file_to_pdf(tmp_rtf.name, output_pdf)
+    finally:
+        os.remove(tmp_rtf.name)
+
+def invoice_context(invoice: Dict[str, Any], totals: Optional[InvoiceTotals] = None) -> Context:
+    # Header fields are top-level names ($invoice_number); the invoice's own keys ($header.date,
+    # $details) and, as the templates write it, $invoices.details refer to the invoice being rendered.
+    # Computed amounts ($subtotal, $tax, $total_due, ...) and $lines (details with $d.line_total)
+    # come from compute_invoice(); header fields of the same name take precedence.
+    totals = totals or compute_invoice(invoice)
+    computed = {**totals.variables(), 'lines': LineItems(invoice.get('details', []), totals)}
+    return Context({**invoice, **computed, 'invoices': invoice, 'invoice': invoice}).child(invoice.get('header', {}))
+
+def render_invoice_rtf(template, invoice: Dict[str, Any]) -> str:
+    return render_template(template, invoice_context(invoice))
+
+def write_invoice_rtf(template, invoice: Dict[str, Any], fileobj) -> int:
+    # Stream the filled RTF into a text file object chunk by chunk; no full-document string is built
+    return as_compiled(template).render_to_file(fileobj, invoice_context(invoice))
+
+# Bump when invoice output changes for the same inputs, so incremental builds re-render everything
+INVOICE_RENDER_VERSION = '2'
+
+# PDF backends: reportlab draws the invoice in-process; pandoc fills the RTF template and converts
+# it (slower, one subprocess and temp files per invoice, but follows the template's layout)
+PDF_BACKENDS = ('reportlab', 'pandoc')
+DEFAULT_BACKEND = 'reportlab'
+
+def render_invoice_pdf(template, invoice: Dict[str, Any], output_pdf: str, backend: str = DEFAULT_BACKEND):
+    if backend == 'reportlab':
+        # Imported here so pandoc-only runs do not load ReportLab
+        from invoice_pdf import write_invoice_pdf
+        write_invoice_pdf(invoice, output_pdf)
+    elif backend == 'pandoc':
+        render_invoice_pdf_pandoc(template, invoice, output_pdf)
+    else:
+        raise ValueError(f'Unknown PDF backend {backend!r}; expected one of {", ".join(PDF_BACKENDS)}')
+
+def render_invoice_pdf_pandoc(template, invoice: Dict[str, Any], output_pdf: str):
+    # Render straight into the temp RTF the converter reads, then convert it
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.rtf', mode='w', encoding='utf-8') as tmp_rtf:
+        write_invoice_rtf(template, invoice, tmp_rtf)
+    try:
+        rtf_file_to_pdf(tmp_rtf.name, output_pdf)
+    finally:
+        os.remove(tmp_rtf.name)
+
+def iter_output_names(invoices: Iterable[Dict[str, Any]]) -> Iterator[tuple]:
+    # (name, invoice) pairs: one PDF per invoice named after its invoice_number; repeats get a numeric suffix
+    used = set()
+    for i, invoice in enumerate(invoices, 1):
+        base = safe_filename(invoice.get('header', {}).get('invoice_number') or f'invoice-{i}')
+        name = f'{base}.pdf'
+        n = 2
+        while name in used:
+            name = f'{base}_{n}.pdf'
+            n += 1
+        used.add(name)
+        yield name, invoice
+
+# Template and backend for batch workers: sent once per process by the pool initializer,
+# with the template compiled there once (the reportlab backend needs no template)
+_worker_template: Optional[CompiledTemplate] = None
+_worker_backend = DEFAULT_BACKEND
+
+def _init_worker(template: Optional[str], backend: str):
+    global _worker_template, _worker_backend
+    _worker_template = compile_template(template) if template is not None else None
+    _worker_backend = backend
+
+def _render_invoice_job(job):
+    invoice, output_pdf = job
+    try:
+        render_invoice_pdf(_worker_template, invoice, output_pdf, _worker_backend)
+    except Exception as exc:
+        return output_pdf, f'{type(exc).__name__}: {exc}'
+    return output_pdf, None
+
+def _render_invoice_chunk(jobs):
+    return [_render_invoice_job(job) for job in jobs]
+
+# Invoices per pool task, and tasks in flight per worker, for streamed batch renders
+RENDER_CHUNK = 16
+CHUNKS_PER_WORKER = 2
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def iter_render_batch(named: Iterable[tuple], template: Optional[str], output_dir: str, workers: Optional[int] = None,
+                      backend: str = DEFAULT_BACKEND) -> Iterator[tuple]:
+    # Render (name, invoice) pairs across a process pool, yielding (pdf path, error or None) in input order.
+    # Only a bounded window of chunks is in flight, so the input can be a stream of any length.
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = ((invoice, os.path.join(output_dir, name)) for name, invoice in named)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(template, backend)
+        yield from map(_render_invoice_job, jobs)
+        return
+    window = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(template, backend)) as executor:
+        for chunk in _chunks(jobs, RENDER_CHUNK):
+            window.append(executor.submit(_render_invoice_chunk, chunk))
+            if len(window) >= workers * CHUNKS_PER_WORKER:
+                yield from window.popleft().result()
+        while window:
+            yield from window.popleft().result()
+
+def _future_result(output_pdf, future):
+    try:
+        future.result()
+    except Exception as exc:
+        return output_pdf, f'{type(exc).__name__}: {exc}'
+    return output_pdf, None
+
+def iter_convert_batch_pooled(named: Iterable[tuple], template: str, output_dir: str, workers: Optional[int] = None,
+                              converter: Optional[str] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                              timeout: float = DEFAULT_TIMEOUT) -> Iterator[tuple]:
+    # Fill each invoice's RTF here (cheap) and hand the conversions to the converter pool's workers,
+    # yielding (pdf path, error or None) in input order. submit() blocks while the converter queue is
+    # full, so staged RTF files and pending results stay bounded however long the input is.
+    os.makedirs(output_dir, exist_ok=True)
+    compiled = as_compiled(template)
+    staging = tempfile.mkdtemp(prefix='invoice-rtf-')
+    pending = deque()
+    try:
+        with ConverterPool(converter, workers or DEFAULT_WORKERS, batch_size, timeout=timeout) as pool:
+            for n, (name, invoice) in enumerate(named):
+                rtf_path = os.path.join(staging, f'{n}.rtf')
+                with open(rtf_path, 'w', encoding='utf-8') as f:
+                    write_invoice_rtf(compiled, invoice, f)
+                output_pdf = os.path.join(output_dir, name)
+                pending.append((output_pdf, pool.submit(rtf_path, output_pdf, remove_input=True)))
+                while pending and pending[0][1].done():
+                    yield _future_result(*pending.popleft())
+            while pending:
+                yield _future_result(*pending.popleft())
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+# Results between manifest saves during a build, bounding the work lost if the process is killed
+MANIFEST_CHECKPOINT = 200
+
+class BuildStats:
+    def __init__(self):
+        self.rendered = 0
+        self.skipped = 0
+        self.failed = []
+        self.removed = []
+
+def build_invoices(invoices: Iterable[Dict[str, Any]], template: Optional[str], output_dir: str, backend: str,
+                   render, full: bool = False) -> BuildStats:
+    # Incremental batch build over a stream of invoices: only invoices whose data, template or renderer
+    # changed since the manifest was written are passed on to render(named pairs), which yields
+    # (pdf path, error) in order. Outputs no longer produced are removed once the input is exhausted.
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = BuildManifest(output_dir)
+    renderer = f'{backend}:{INVOICE_RENDER_VERSION}'
+    tmpl_hash = template_hash(template) if template is not None else None
+    stats = BuildStats()
+    seen = []
+    # Manifest entries for invoices handed to the renderer whose results have not come back yet
+    in_flight = deque()
+
+    def changed():
+        for name, invoice in iter_output_names(invoices):
+            seen.append(name)
+            entry = BuildManifest.entry(invoice, tmpl_hash, renderer)
+            if not full and manifest.is_current(name, entry):
+                stats.skipped += 1
+                continue
+            in_flight.append((name, entry))
+            yield name, invoice
+
+    try:
+        for path, error in render(changed()):
+            name, entry = in_flight.popleft()
+            if error:
+                manifest.forget(name)
+                stats.failed.append((path, error))
+            else:
+                manifest.record(name, entry)
+                stats.rendered += 1
+            if (stats.rendered + len(stats.failed)) % MANIFEST_CHECKPOINT == 0:
+                manifest.save()
+        # Only a fully read input says which outputs are orphaned
+        stats.removed = manifest.remove_orphans(seen)
+    finally:
+        # Saved even when interrupted, so a rerun skips everything already rendered
+        manifest.save()
+    return stats
+
+def check_invoices(invoices: Iterable[Dict[str, Any]]) -> int:
+    # Print every provided total that disagrees with the computed one, and every invoice whose amounts
+    # cannot be computed; exit status 1 if any
+    checked = bad = 0
+    for name, invoice in iter_output_names(invoices):
+        checked += 1
+        try:
+            totals = compute_invoice(invoice)
+        except ValueError as exc:
+            bad += 1
+            print(f'{name[:-4]} invalid: {exc}')
+            continue
+        if totals.ok:
+            continue
+        bad += 1
+        details = invoice.get('details', [])
+        for index, provided, computed in totals.mismatches:
+            print(f'{name[:-4]} line {index + 1} ({details[index].get("description", "")}): '
+                  f'total {format_cents(provided)}, computed {format_cents(computed)}')
+        if totals.total_mismatch:
+            provided, computed = totals.total_mismatch
+            print(f'{name[:-4]} invoice total {format_cents(provided)}, computed {format_cents(computed)}')
+    print(f'Checked {checked} invoices: {bad} with mismatched or invalid totals')
+    return 1 if bad else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render invoices from a JSON data file to PDF.')
+    parser.add_argument('--data', default='data.json')
+    parser.add_argument('--template', default='template2.rtf')
+    parser.add_argument('--batch', action='store_true', help='render every invoice, one PDF per invoice_number')
+    parser.add_argument('--output', default='invoice_output.pdf', help='output PDF for the first invoice (single mode)')
+    parser.add_argument('--output-dir', default='invoices', help='output directory (batch mode)')
+    parser.add_argument('--workers', type=int, help='worker processes for batch mode (default: one per core)')
+    parser.add_argument('--backend', choices=PDF_BACKENDS, default=DEFAULT_BACKEND,
+                        help='reportlab renders in-process; pandoc converts the filled RTF template (layout fidelity)')
+    parser.add_argument('--converter', choices=CONVERTERS,
+                        help='converter for pandoc-backend batch runs (default: best available)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='documents per converter run (soffice without uno, docx2pdf)')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='seconds allowed per document conversion')
+    parser.add_argument('--full', action='store_true', help='re-render every invoice, ignoring the build manifest')
+    parser.add_argument('--ndjson', action='store_true', help='read --data as one invoice per line (default for .ndjson/.jsonl)')
+    parser.add_argument('--check', action='store_true', help='only validate line and invoice totals, rendering nothing')
+    args = parser.parse_args(argv)
+
+    invoices = iter_invoices(args.data, True if args.ndjson else None)
+    if args.check:
+        return check_invoices(invoices)
+    template = load_rtf(args.template) if args.backend == 'pandoc' else None
+    if not args.batch:
+        invoice = next(invoices, None)
+        invoices.close()
+        if invoice is None:
+            print(f'No invoices in {args.data}', file=sys.stderr)
+            return 1
+        render_invoice_pdf(template, invoice, args.output, args.backend)
+        print(f'Generated PDF: {args.output}')
+        return 0
+    if args.backend == 'pandoc':
+        def render(named):
+            return iter_convert_batch_pooled(named, template, args.output_dir, args.workers,
+                                             args.converter, args.batch_size, args.timeout)
+    else:
+        def render(named):
+            return iter_render_batch(named, template, args.output_dir, args.workers, args.backend)
+    # Invoices are read one at a time, so rendering starts while the rest of the file is still being parsed
+    stats = build_invoices(invoices, template, args.output_dir, args.backend, render, args.full)
+    for path, error in stats.failed:
+        print(f'Failed {path}: {error}', file=sys.stderr)
+    print(f'Generated {stats.rendered} of {stats.rendered + len(stats.failed)} PDFs in {args.output_dir} '
+          f'({stats.skipped} unchanged, {len(stats.removed)} orphaned removed)')
+    return 1 if stats.failed else 0
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    sys.exit(main())
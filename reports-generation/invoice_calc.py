@@ -0,0 +1,147 @@
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+
+# Fixed-point scales: amounts are exact integers in these units while computing
+QTY_SCALE = 1000          # quantities to 1/1000 of a unit
+PRICE_SCALE = 10000       # unit prices to 1/100 of a cent
+CENTS = 100
+RATE_SCALE = 1000000      # tax / discount rates to 1e-6
+
+
+def _column(details, key):
+    # One float64 column; missing or null values become NaN
+    values = [d.get(key) for d in details]
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        pass
+    # Blank strings and the like: convert one by one
+    column = np.empty(len(values), dtype=np.float64)
+    for i, v in enumerate(values):
+        try:
+            column[i] = np.nan if v is None or v == '' else float(v)
+        except (TypeError, ValueError):
+            raise ValueError(f'Line {i + 1}: invalid {key} {v!r}') from None
+    return column
+
+
+def _fixed(values, scale):
+    return np.rint(np.nan_to_num(values) * scale).astype(np.int64)
+
+
+def _div_half_up(num, den):
+    # Integer division rounding halves away from zero (ROUND_HALF_UP), elementwise or scalar
+    if isinstance(num, np.ndarray):
+        return np.sign(num) * ((np.abs(num) * 2 + den) // (2 * den))
+    return (1 if num >= 0 else -1) * ((abs(num) * 2 + den) // (2 * den))
+
+
+def parse_rate(value):
+    """0.08, '0.08' or '8%' -> rate in RATE_SCALE units (0 when absent)."""
+    if value is None or value == '':
+        return 0
+    text = str(value).strip()
+    try:
+        rate = Decimal(text[:-1]) / 100 if text.endswith('%') else Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f'Invalid rate {value!r}') from None
+    return int((rate * RATE_SCALE).to_integral_value())
+
+
+def to_cents(value):
+    try:
+        return int((Decimal(str(value)) * CENTS).quantize(Decimal(1), rounding='ROUND_HALF_UP'))
+    except InvalidOperation:
+        raise ValueError(f'Invalid amount {value!r}') from None
+
+
+def format_cents(cents, symbol='', thousands=''):
+    """Integer cents as '1234.50', or with symbol='$', thousands=',' as '$1,234.50' (sign first)."""
+    sign = '-' if cents < 0 else ''
+    whole, frac = divmod(abs(int(cents)), CENTS)
+    return f'{sign}{symbol}{whole:,}'.replace(',', thousands) + f'.{frac:02d}'
+
+
+class InvoiceTotals:
+    """Line totals and invoice totals in integer cents, with mismatches against the provided figures.
+
+    mismatches holds (line index, provided cents, computed cents) for every
+    line whose 'total' disagrees with quantity * unit_price rounded half-up
+    to the cent; total_mismatch is (provided, computed) for a header 'total'.
+    """
+
+    def __init__(self, line_cents, provided, subtotal, discount, tax, tax_rate, provided_total=None):
+        self.line_cents = line_cents
+        self.subtotal = subtotal
+        self.discount = discount
+        self.tax = tax
+        self.tax_rate = tax_rate
+        self.total = subtotal - discount + tax
+        self.mismatches = [(int(i), int(provided[i]), int(line_cents[i]))
+                           for i in np.flatnonzero(provided != line_cents)]
+        self.total_mismatch = None
+        if provided_total is not None and provided_total != self.total:
+            self.total_mismatch = (provided_total, self.total)
+
+    @property
+    def ok(self):
+        return not self.mismatches and self.total_mismatch is None
+
+    def variables(self):
+        """Template variables: formatted amounts plus mismatch counts."""
+        return {
+            'subtotal': format_cents(self.subtotal),
+            'discount': format_cents(self.discount),
+            'tax': format_cents(self.tax),
+            'tax_rate': f'{Decimal(self.tax_rate) / (RATE_SCALE // 100):f}%',
+            'total_due': format_cents(self.total),
+            'line_count': len(self.line_cents),
+            'mismatch_count': len(self.mismatches) + (self.total_mismatch is not None),
+        }
+
+
+class LineItems:
+    """An invoice's details with a formatted 'line_total' per item, built as a template loop walks them."""
+
+    def __init__(self, details, totals):
+        self.details = details
+        self.totals = totals
+
+    def __len__(self):
+        return len(self.details)
+
+    def __iter__(self):
+        for item, cents in zip(self.details, self.totals.line_cents.tolist()):
+            yield {**item, 'line_total': format_cents(cents)}
+
+
+def compute_invoice(invoice):
+    """Compute an invoice's line totals, subtotal, discount, tax and total from its details.
+
+    Quantities and unit prices are loaded as columns and scaled to exact
+    integers, so the per-line products, the half-up rounding to cents and the
+    subtotal are vectorized integer operations with no binary float drift.
+    Header fields used: discount (amount) or discount_rate, tax_rate, total.
+    Raises ValueError for non-numeric amounts or rates and for a discount that
+    is negative or larger than the subtotal.
+    """
+    header = invoice.get('header', {})
+    details = invoice.get('details', [])
+    qty = _fixed(_column(details, 'quantity'), QTY_SCALE)
+    price = _fixed(_column(details, 'unit_price'), PRICE_SCALE)
+    line_cents = _div_half_up(qty * price, QTY_SCALE * PRICE_SCALE // CENTS)
+    given = _column(details, 'total')
+    # Lines without a provided total have nothing to disagree with
+    provided = np.where(np.isnan(given), line_cents, _fixed(given, CENTS))
+    subtotal = int(line_cents.sum())
+    if header.get('discount') not in (None, ''):
+        discount = to_cents(header['discount'])
+    else:
+        discount = _div_half_up(subtotal * parse_rate(header.get('discount_rate')), RATE_SCALE)
+    if discount < 0 or discount > max(subtotal, 0):
+        raise ValueError(f'Discount {format_cents(discount)} is outside 0..{format_cents(max(subtotal, 0))} (the subtotal)')
+    tax_rate = parse_rate(header.get('tax_rate'))
+    tax = _div_half_up((subtotal - discount) * tax_rate, RATE_SCALE)
+    provided_total = to_cents(header['total']) if header.get('total') not in (None, '') else None
+    return InvoiceTotals(line_cents, provided, subtotal, discount, tax, tax_rate, provided_total)
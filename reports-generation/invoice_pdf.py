@@ -0,0 +1,110 @@
+import io
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfgen import canvas
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from invoice_calc import compute_invoice, format_cents
+from pdf_table import Column, PdfTable
+
+MARGIN = 50
+DETAIL_COLUMNS = [
+    Column('DESCRIPTION', 272),
+    Column('QTY', 60, 'right'),
+    Column('UNIT PRICE', 90, 'right'),
+    Column('TOTAL', 90, 'right'),
+]
+# Header labels: (label, header key, x, offset from page top)
+INVOICE_FIELDS = [
+    ('INVOICE NUMBER', 'invoice_number', MARGIN, 80),
+    ('DATE', 'date', 330, 80),
+    ('CUSTOMER', 'customer_name', MARGIN, 96),
+    ('DUE DATE', 'due_date', 330, 96),
+]
+ADDRESS_LABEL = 'ADDRESS'
+ADDRESS_WIDTH = 260
+LABEL_WIDTHS = {label: stringWidth(label + '  ', 'Helvetica', 10)
+                for label in [f[0] for f in INVOICE_FIELDS] + [ADDRESS_LABEL]}
+CONTINUATION_TITLE_WIDTH = stringWidth('INVOICE  ', 'Helvetica-Bold', 10)
+
+
+def money(value):
+    return '' if value is None or value == '' else f'${float(value):,.2f}'
+
+
+def quantity(value):
+    if value is None or value == '':
+        return ''
+    return f'{value:g}' if isinstance(value, float) else str(value)
+
+
+def define_invoice_forms(c, width, height):
+    """Static invoice chrome as form XObjects: first-page title and labels, continuation title."""
+    c.beginForm('invoice-chrome')
+    c.setFont('Helvetica-Bold', 22)
+    c.drawString(MARGIN, height-50, 'INVOICE')
+    c.setFont('Helvetica', 10)
+    for label, _, x, dy in INVOICE_FIELDS:
+        c.drawString(x, height-dy, label)
+    c.drawString(MARGIN, height-112, ADDRESS_LABEL)
+    c.endForm()
+    c.beginForm('invoice-continuation')
+    c.setFont('Helvetica-Bold', 10)
+    c.drawString(MARGIN, height-40, 'INVOICE')
+    c.endForm()
+
+
+def draw_continuation(c, header, height, page):
+    c.doForm('invoice-continuation')
+    c.setFont('Helvetica-Bold', 10)
+    c.drawString(MARGIN + CONTINUATION_TITLE_WIDTH, height-40, f"{header.get('invoice_number', '')}  (page {page})")
+
+
+def cents(value):
+    # Integer cents from invoice_calc, formatted like money()
+    return format_cents(value, '$', ',')
+
+
+def detail_rows(details, line_cents):
+    # TOTAL is the computed line total (quantity x unit price, rounded half-up to the cent)
+    for item, total in zip(details, line_cents.tolist()):
+        yield [item.get('description', ''), quantity(item.get('quantity')),
+               money(item.get('unit_price')), cents(total)]
+
+
+def render_invoice_pdf_bytes(invoice):
+    """Render an invoice ({'header': {...}, 'details': [...]}) to PDF bytes in memory."""
+    header = invoice.get('header', {})
+    details = invoice.get('details', [])
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+    define_invoice_forms(c, width, height)
+    c.doForm('invoice-chrome')
+    c.setFont('Helvetica', 10)
+    for label, key, x, dy in INVOICE_FIELDS:
+        c.drawString(x + LABEL_WIDTHS[label], height-dy, str(header.get(key, '')))
+    address_x = MARGIN + LABEL_WIDTHS[ADDRESS_LABEL]
+    y = height - 112
+    for line in simpleSplit(str(header.get('customer_address', '')), 'Helvetica', 10, ADDRESS_WIDTH) or ['']:
+        c.drawString(address_x, y, line)
+        y -= 12
+    table = PdfTable(c, DETAIL_COLUMNS, x=MARGIN, top=y-20, bottom=MARGIN, page_top=height-60,
+                     on_new_page=lambda c, page: draw_continuation(c, header, height, page))
+    table.header()
+    totals = compute_invoice(invoice)
+    table.rows(detail_rows(details, totals.line_cents))
+    table.row(['SUBTOTAL', '', '', cents(totals.subtotal)])
+    if totals.discount:
+        table.row(['DISCOUNT', '', '', cents(-totals.discount)])
+    if totals.tax_rate:
+        table.row([f"TAX ({totals.variables()['tax_rate']})", '', '', cents(totals.tax)])
+    table.row(['TOTAL DUE', '', '', cents(totals.total)], font='Helvetica-Bold')
+    c.save()
+    return buffer.getvalue()
+
+
+def write_invoice_pdf(invoice, output_pdf):
+    with open(output_pdf, 'wb') as f:
+        f.write(render_invoice_pdf_bytes(invoice))
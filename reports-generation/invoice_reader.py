@@ -0,0 +1,142 @@
+import json
+
+try:
+    import ijson
+except ImportError:  # the hand-rolled scanner below is used instead
+    ijson = None
+
+READ_SIZE = 64 * 1024
+NDJSON_SUFFIXES = ('.ndjson', '.jsonl')
+WHITESPACE = ' \t\n\r'
+# Characters that can extend a JSON number ('12.' -> '12.50', '1e' -> '1e3')
+NUMBER_CHARS = '0123456789.eE+-'
+
+
+class _Scanner:
+    """Pull-based reader over a text file for the fallback parser.
+
+    Values are decoded with json.JSONDecoder.raw_decode from a buffer that
+    holds only the unread part of the file; when a value is cut off at the
+    buffer end more text is read (doubling the read size each time, so one
+    large value costs linear time) and the decode is retried.
+    """
+
+    def __init__(self, f, read_size=READ_SIZE):
+        self.f = f
+        self.read_size = read_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size):
+        if self.eof:
+            return False
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character (not consumed), or '' at end of input."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill(self.read_size):
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f'Expected {char!r} in invoice JSON, found {found or "end of input"!r}')
+        self.pos += 1
+
+    def _may_continue(self, value, end):
+        # A value touching the buffer end, or a number followed only by characters that could
+        # extend it, may go on in the next chunk; raw_decode stops at the shorter number
+        rest = self.buf[end:]
+        if not rest:
+            return True
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and not rest.strip(NUMBER_CHARS)
+
+    def value(self):
+        self.peek()
+        size = self.read_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                if self.eof or not self._may_continue(value, end):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self._fill(size):
+                continue
+            size *= 2
+
+
+def _scan_invoices(f, key, read_size=READ_SIZE):
+    scanner = _Scanner(f, read_size)
+    scanner.expect('{')
+    if scanner.peek() == '}':
+        return
+    while True:
+        name = scanner.value()
+        scanner.expect(':')
+        if name == key:
+            scanner.expect('[')
+            if scanner.peek() == ']':
+                scanner.pos += 1
+            else:
+                while True:
+                    yield scanner.value()
+                    if scanner.peek() == ']':
+                        scanner.pos += 1
+                        break
+                    scanner.expect(',')
+        else:
+            scanner.value()
+        if scanner.peek() == '}':
+            return
+        scanner.expect(',')
+
+
+def iter_ndjson(f):
+    for line_no, line in enumerate(f, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f'Line {line_no}: {exc}') from None
+
+
+def is_ndjson(path):
+    return str(path).lower().endswith(NDJSON_SUFFIXES)
+
+
+def iter_invoices(path, ndjson=None, key='invoices'):
+    """Yield invoices one at a time from path without loading the whole file.
+
+    NDJSON / JSON Lines files (one invoice per line; chosen by suffix unless
+    ndjson is given) are read line by line. Otherwise the items of the
+    top-level `key` array are parsed incrementally, with ijson when it is
+    installed and a raw_decode scanner when it is not. Memory is bounded by
+    the largest single invoice.
+    """
+    if ndjson is None:
+        ndjson = is_ndjson(path)
+    if ndjson:
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from iter_ndjson(f)
+    elif ijson is not None:
+        with open(path, 'rb') as f:
+            yield from ijson.items(f, f'{key}.item', use_float=True)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from _scan_invoices(f, key)
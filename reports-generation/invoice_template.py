@@ -0,0 +1,186 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# One alternative per token kind; everything between matches is literal text
+TOKEN_RE = re.compile(r'''
+    @foreach\(\$?(\w+(?:\.\w+)*)(?:\s+as\s+(\w+))?\)   # 1, 2: loop over a dotted path, optional alias
+  | (@end-foreach)                                    # 3: loop end
+  | \$\{(\w+(?:\.\w+)*)\}                             # 4: ${a.b.c}
+  | \$(\w+(?:\.\w+)*)                                 # 5: $name / $a.b.c
+''', re.VERBOSE)
+
+DEFAULT_ALIAS = 'd'
+MAX_CACHED = 32
+# Characters gathered before each write() when rendering to a file
+WRITE_CHUNK_SIZE = 64 * 1024
+
+_MISSING = object()
+
+
+class TemplateSyntaxError(ValueError):
+    pass
+
+
+class Context:
+    """Template variables as nested dicts/lists, looked up by dotted path.
+
+    "header.customer_name", "invoices.details" and "d.0" all resolve; a child
+    scope (e.g. a @foreach alias) shadows its parent.
+    """
+
+    def __init__(self, values: Dict[str, Any], parent: Optional['Context'] = None):
+        self.values = values
+        self.parent = parent
+
+    def child(self, values: Dict[str, Any]) -> 'Context':
+        return Context(values, self)
+
+    def resolve(self, keys, default: Any = None) -> Any:
+        name = keys[0]
+        scope = self
+        while scope is not None and name not in scope.values:
+            scope = scope.parent
+        if scope is None:
+            return default
+        value = scope.values[name]
+        for key in keys[1:]:
+            if isinstance(value, dict) and key in value:
+                value = value[key]
+            elif isinstance(value, list) and key.isdigit() and int(key) < len(value):
+                value = value[int(key)]
+            else:
+                return default
+        return value
+
+    def lookup(self, path: str, default: Any = None) -> Any:
+        return self.resolve(path.split('.'), default)
+
+
+def as_context(context) -> Context:
+    return context if isinstance(context, Context) else Context(context)
+
+
+class CompiledTemplate:
+    """A template parsed once into a tree of text, variable and loop nodes.
+
+    Nodes are tuples: (TEXT, str), (VAR, keys, raw) and (LOOP, keys, alias, body).
+    Rendering walks the tree without any regex work, so its cost follows the
+    size of the output. Unknown variables render back as their raw text.
+    """
+
+    TEXT, VAR, LOOP = 0, 1, 2
+
+    def __init__(self, source: str):
+        self.source = source
+        self.nodes = self._parse(source)
+
+    @classmethod
+    def _parse(cls, source: str) -> List[tuple]:
+        root: List[tuple] = []
+        stack = [root]
+        opened = []
+        pos = 0
+        for m in TOKEN_RE.finditer(source):
+            body = stack[-1]
+            if m.start() > pos:
+                cls._text(body, source[pos:m.start()])
+            pos = m.end()
+            if m.group(1) is not None:
+                loop_body: List[tuple] = []
+                body.append((cls.LOOP, tuple(m.group(1).split('.')), m.group(2) or DEFAULT_ALIAS, loop_body))
+                stack.append(loop_body)
+                opened.append(m.start())
+            elif m.group(3) is not None:
+                if len(stack) == 1:
+                    raise TemplateSyntaxError(f'@end-foreach without @foreach at offset {m.start()}')
+                stack.pop()
+                opened.pop()
+            else:
+                path = m.group(4) or m.group(5)
+                body.append((cls.VAR, tuple(path.split('.')), m.group(0)))
+        if opened:
+            raise TemplateSyntaxError(f'@foreach at offset {opened[-1]} has no @end-foreach')
+        if pos < len(source):
+            cls._text(stack[-1], source[pos:])
+        return root
+
+    @classmethod
+    def _text(cls, body, text):
+        # Merge adjacent literals so rendering appends one string per run
+        if body and body[-1][0] == cls.TEXT:
+            body[-1] = (cls.TEXT, body[-1][1] + text)
+        else:
+            body.append((cls.TEXT, text))
+
+    def _emit(self, nodes, context, out):
+        for node in nodes:
+            kind = node[0]
+            if kind == self.TEXT:
+                out(node[1])
+            elif kind == self.VAR:
+                value = context.resolve(node[1], _MISSING)
+                out(node[2] if value is _MISSING else str(value))
+            else:
+                _, keys, alias, body = node
+                for item in context.resolve(keys) or ():
+                    self._emit(body, context.child({alias: item}), out)
+
+    def render_to(self, write, context) -> None:
+        """Render by calling write(str) for each piece of output."""
+        self._emit(self.nodes, as_context(context), write)
+
+    def render_to_file(self, fileobj, context, chunk_size: int = WRITE_CHUNK_SIZE) -> int:
+        """Render into a text file object in chunk_size pieces; returns characters written.
+
+        Only the current chunk is held in memory, so memory stays flat however
+        many loop items the context has.
+        """
+        pending: List[str] = []
+        size = 0
+        written = 0
+
+        def write(piece):
+            nonlocal size, written
+            pending.append(piece)
+            size += len(piece)
+            if size >= chunk_size:
+                fileobj.write(''.join(pending))
+                written += size
+                pending.clear()
+                size = 0
+
+        self.render_to(write, context)
+        fileobj.write(''.join(pending))
+        return written + size
+
+    def render(self, context) -> str:
+        parts: List[str] = []
+        self.render_to(parts.append, context)
+        return ''.join(parts)
+
+
+_cache: 'OrderedDict[str, CompiledTemplate]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def template_hash(source: str) -> str:
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def compile_template(source: str) -> CompiledTemplate:
+    """Compiled template for source, parsed once per distinct content and kept in a small LRU."""
+    key = template_hash(source)
+    with _cache_lock:
+        compiled = _cache.get(key)
+        if compiled is not None:
+            _cache.move_to_end(key)
+            return compiled
+    compiled = CompiledTemplate(source)
+    with _cache_lock:
+        _cache[key] = compiled
+        while len(_cache) > MAX_CACHED:
+            _cache.popitem(last=False)
+    return compiled
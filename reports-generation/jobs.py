@@ -0,0 +1,206 @@
+import json
+import os
+import re
+import stat
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_MAX_PENDING = 32
+DEFAULT_TTL = 3600
+# Results and metadata live in a directory only this user can use; REPORT_JOB_DIR overrides the location
+RESULT_DIR_ENV = 'REPORT_JOB_DIR'
+DEFAULT_RESULT_DIR = os.environ.get(RESULT_DIR_ENV) or os.path.join(
+    tempfile.gettempdir(), f"report-jobs-{os.getuid() if hasattr(os, 'getuid') else 'user'}")
+METADATA_SUFFIX = '.json'
+# Minimum seconds between directory sweeps triggered by submit() and get()
+CLEANUP_INTERVAL = 60
+
+_JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class QueueFull(Exception):
+    pass
+
+
+def private_dir(path):
+    """Create path with mode 0700, or check that an existing one is ours and not open to others."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise RuntimeError(f'Job result directory {path} is not a directory')
+    if hasattr(os, 'getuid') and (info.st_uid != os.getuid() or info.st_mode & 0o077):
+        raise RuntimeError(f'Job result directory {path} must be owned by this user with mode 0700')
+    return path
+
+
+class Job:
+    def __init__(self, kind, download_name, mimetype):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.download_name = download_name
+        self.mimetype = mimetype
+        self.status = 'queued'
+        self.progress = 0.0
+        self.error = None
+        self.size = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    @classmethod
+    def from_dict(cls, data):
+        job = cls.__new__(cls)
+        job.id = data['id']
+        job.kind = data['kind']
+        job.download_name = data['download_name']
+        job.mimetype = data['mimetype']
+        job.status = data['status']
+        job.progress = data['progress']
+        job.error = data['error']
+        job.size = data['size']
+        job.created = data['created']
+        job.started = data['started']
+        job.finished = data['finished']
+        return job
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'error': self.error,
+            'size': self.size,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class JobManager:
+    """Bounded background executor for report renders, with results kept on disk for `ttl` seconds.
+
+    Each job's metadata is written next to its result as <id>.json, so any
+    process sharing result_dir (e.g. every worker of a preforking server) can
+    report on and serve it, and cleanup() expires files left by earlier runs.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, max_pending=DEFAULT_MAX_PENDING,
+                 result_dir=DEFAULT_RESULT_DIR, ttl=DEFAULT_TTL):
+        self.max_pending = max_pending
+        self.result_dir = result_dir
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report-job')
+        # Jobs this process has queued or is running; finished ones are read back from disk
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+        private_dir(result_dir)
+
+    def result_path(self, job):
+        # Always derived from the id, never read back from metadata
+        return os.path.join(self.result_dir, job.id)
+
+    def _metadata_path(self, job_id):
+        return os.path.join(self.result_dir, job_id + METADATA_SUFFIX)
+
+    def _save(self, job):
+        # Write-then-rename so readers in other processes never see a partial file
+        path = self._metadata_path(job.id)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({**job.to_dict(), 'download_name': job.download_name, 'mimetype': job.mimetype}, f)
+        os.replace(tmp, path)
+
+    def submit(self, kind, fn, args, download_name, mimetype):
+        """Queue fn(*args) -> bytes and return the Job; raises QueueFull when too many are waiting."""
+        self._maybe_cleanup()
+        job = Job(kind, download_name, mimetype)
+        with self._lock:
+            active = len(self._jobs)
+            if active >= self.max_pending:
+                raise QueueFull(f'{active} report jobs already queued or running')
+            self._jobs[job.id] = job
+        self._save(job)
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job, fn, args):
+        job.status = 'running'
+        job.started = time.time()
+        job.progress = 0.1
+        try:
+            self._save(job)
+            body = fn(*args)
+            job.progress = 0.9
+            with open(self.result_path(job), 'wb') as f:
+                f.write(body)
+        except Exception as exc:
+            job.error = f'{type(exc).__name__}: {exc}'
+            job.status = 'failed'
+        else:
+            job.size = len(body)
+            job.progress = 1.0
+            job.status = 'done'
+        job.finished = time.time()
+        try:
+            self._save(job)
+        finally:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+
+    def get(self, job_id):
+        self._maybe_cleanup()
+        if not _JOB_ID.match(job_id):
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        try:
+            with open(self._metadata_path(job_id), 'r', encoding='utf-8') as f:
+                job = Job.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return job if job.id == job_id else None
+
+    def _maybe_cleanup(self):
+        # Sweep at most once per CLEANUP_INTERVAL so polling costs the same however many results are kept
+        now = time.time()
+        with self._lock:
+            if now - self._last_cleanup < CLEANUP_INTERVAL:
+                return
+            self._last_cleanup = now
+        self.cleanup(now)
+
+    def cleanup(self, now=None):
+        # Delete result and metadata files not modified within the TTL, whichever process wrote them;
+        # jobs still queued or running here are kept however long they take
+        now = time.time() if now is None else now
+        with self._lock:
+            active = set(self._jobs)
+        removed = set()
+        try:
+            entries = list(os.scandir(self.result_dir))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            job_id = entry.name.split('.', 1)[0]
+            if job_id in active:
+                continue
+            try:
+                if now - entry.stat().st_mtime <= self.ttl:
+                    continue
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith(METADATA_SUFFIX):
+                removed.add(job_id)
+        return len(removed)
+
+
+job_manager = JobManager()
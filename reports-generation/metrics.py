@@ -0,0 +1,139 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+# Latency buckets in seconds (Prometheus histogram upper bounds)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Request header that asks for a Server-Timing breakdown on the response
+TIMING_HEADER = 'X-Report-Timing'
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Per-route stage latency histograms and byte counters, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.requests = {}
+        self.bytes = {}
+
+    def observe_stage(self, route, stage, seconds):
+        with self._lock:
+            self.stages.setdefault((route, stage), Histogram()).observe(seconds)
+
+    def observe_request(self, route, status, seconds, nbytes):
+        with self._lock:
+            self.requests.setdefault((route, str(status)), Histogram()).observe(seconds)
+            if nbytes:
+                self.bytes[route] = self.bytes.get(route, 0) + nbytes
+
+    def render(self, extra=None):
+        # extra: {name: (type, help, value)} for values owned elsewhere, e.g. cache counters
+        lines = []
+        with self._lock:
+            lines += _histogram_lines('report_stage_seconds', 'Time spent in each rendering stage per route.',
+                                      {(('route', r), ('stage', s)): h for (r, s), h in self.stages.items()})
+            lines += _histogram_lines('report_request_seconds', 'End-to-end request latency per route.',
+                                      {(('route', r), ('status', s)): h for (r, s), h in self.requests.items()})
+            lines.append('# HELP report_response_bytes_total Response body bytes sent per route.')
+            lines.append('# TYPE report_response_bytes_total counter')
+            for route, n in sorted(self.bytes.items()):
+                lines.append(f'report_response_bytes_total{{route="{route}"}} {n}')
+        for name, (kind, help_text, value) in (extra or {}).items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(pairs, extra=()):
+    return '{' + ','.join(f'{k}="{v}"' for k, v in tuple(pairs) + tuple(extra)) + '}'
+
+
+def _histogram_lines(name, help_text, series):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for labels, h in sorted(series.items()):
+        cumulative = 0
+        for bound, n in zip(h.buckets, h.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{_labels(labels, (("le", repr(bound)),))} {cumulative}')
+        lines.append(f'{name}_bucket{_labels(labels, (("le", "+Inf"),))} {h.count}')
+        lines.append(f'{name}_sum{_labels(labels)} {h.sum}')
+        lines.append(f'{name}_count{_labels(labels)} {h.count}')
+    return lines
+
+
+metrics = Metrics()
+
+
+def current_route():
+    if has_request_context():
+        return request.endpoint or 'unknown'
+    return 'background'
+
+
+def record_stage(name, seconds):
+    # Stage timings also go on flask.g so the Server-Timing header can list them
+    metrics.observe_stage(current_route(), name, seconds)
+    if has_request_context():
+        g.setdefault('report_stages', []).append((name, seconds))
+
+
+@contextmanager
+def stage(name):
+    """Time a block as one stage of the current route."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+class StageTimer:
+    """Times consecutive stages: lap(name) closes the stage begun at the previous lap."""
+
+    def __init__(self):
+        self._last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        record_stage(name, now - self._last)
+        self._last = now
+
+
+def start_request():
+    g.report_start = time.perf_counter()
+
+
+def finish_request(response):
+    start = g.get('report_start')
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    metrics.observe_request(current_route(), response.status_code, elapsed, response.content_length)
+    if request.headers.get(TIMING_HEADER):
+        parts = [f'{name};dur={seconds * 1000:.3f}' for name, seconds in g.get('report_stages', [])]
+        parts.append(f'total;dur={elapsed * 1000:.3f}')
+        response.headers['Server-Timing'] = ', '.join(parts)
+    return response
@@ -0,0 +1,99 @@
+import io
+
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.pdfgen import canvas
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from metrics import StageTimer
+from pdf_table import Column, PdfTable
+
+PDF_CATEGORY_WIDTHS = [65, 65, 65, 65, 65, 65, 65, 65, 65, 65, 70]
+
+# Static PDF chrome: header labels (label, x, offset from page top, data key)
+PDF_HEADER_FIELDS = [
+    ('SALESPERSON', 30, 60, 'salesperson'),
+    ('WEEK ENDING', 300, 60, 'weekEnding'),
+    ('LOCATION', 30, 75, 'location'),
+    ("TODAY'S DATE", 300, 75, 'today'),
+]
+CONTINUATION_TITLE_WIDTH = stringWidth('WEEKLY SALES ACTIVITY  ', 'Helvetica-Bold', 10)
+PDF_LABEL_WIDTHS = {label: stringWidth(label + '  ', 'Helvetica', 10) for label, _, _, _ in PDF_HEADER_FIELDS}
+
+
+def pdf_columns(categories):
+    # DAYS plus one right-aligned column per category
+    return [Column('DAYS', 60)] + [Column(cat, width, 'right') for cat, width in zip(categories, PDF_CATEGORY_WIDTHS)]
+
+
+def define_pdf_forms(c, width, height):
+    """Define the static chrome once per document as form XObjects (title/labels, continuation title, footer)."""
+    c.beginForm('chrome')
+    c.setFont('Helvetica-Bold', 22)
+    c.drawString(30, height-40, 'WEEKLY SALES ACTIVITY')
+    c.setFont('Helvetica', 10)
+    for label, x, dy, _ in PDF_HEADER_FIELDS:
+        c.drawString(x, height-dy, label)
+    c.endForm()
+    c.beginForm('continuation')
+    c.setFont('Helvetica-Bold', 10)
+    c.drawString(30, height-40, 'WEEKLY SALES ACTIVITY')
+    c.endForm()
+    # Footer is drawn relative to y=0 and placed with a translate
+    c.beginForm('footer', lowery=-50, upperx=width, uppery=0)
+    c.setFont('Helvetica', 10)
+    c.drawString(30, -10, '*EXPLANATION')
+    c.drawString(30, -40, 'Approval')
+    c.endForm()
+
+
+def draw_pdf_continuation(c, data, height, page):
+    # Running header for pages after the first
+    c.doForm('continuation')
+    c.setFont('Helvetica-Bold', 10)
+    c.drawString(30 + CONTINUATION_TITLE_WIDTH, height-40, f"{data['salesperson']}  (page {page})")
+
+
+def render_pdf(data):
+    """Render the styled landscape PDF report."""
+    timer = StageTimer()
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=landscape(A4))
+    width, height = landscape(A4)
+    define_pdf_forms(c, width, height)
+    c.doForm('chrome')
+    c.setFont('Helvetica', 10)
+    for label, x, dy, key in PDF_HEADER_FIELDS:
+        c.drawString(x + PDF_LABEL_WIDTHS[label], height-dy, str(data[key]))
+    table = PdfTable(c, pdf_columns(data['categories']), x=30, top=height-100, bottom=40, page_top=height-60,
+                     on_new_page=lambda c, page: draw_pdf_continuation(c, data, height, page))
+    table.header()
+    table.rows([day['name']] + [f"${val:.2f}" if val else "$0.00" for val in day['values']] for day in data['days'])
+    # Totals, Goal, Variance
+    table.row(['Totals'] + [f"${val:.2f}" for val in data['totals']], font='Helvetica-Bold')
+    table.row(['GOAL'] + [f"${val:.2f}" for val in data['goal']])
+    table.row(['VARIANCE'] + [f"${val:+.2f}" for val in data['variance']])
+    y = table.space(50)
+    c.saveState()
+    c.translate(0, y)
+    c.doForm('footer')
+    c.restoreState()
+    timer.lap('draw')
+    c.save()
+    timer.lap('save')
+    return buffer.getvalue()
+
+
+def render_text_pdf(lines):
+    """Render plain text lines (the converted RTF template) onto an A4 PDF."""
+    timer = StageTimer()
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    textobject = c.beginText(30, 800)
+    textobject.setFont('Helvetica', 12)
+    for line in lines:
+        textobject.textLine(line)
+    c.drawText(textobject)
+    timer.lap('draw')
+    c.save()
+    timer.lap('save')
+    return buffer.getvalue()
@@ -0,0 +1,116 @@
+from itertools import accumulate
+
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+
+class Column:
+    def __init__(self, title, width, align='left'):
+        self.title = title
+        self.width = width
+        self.align = align
+
+
+class PdfTable:
+    """Row-at-a-time table layout on a ReportLab canvas with automatic page breaks.
+
+    Column offsets are computed once; each row is measured (wrapping text that
+    does not fit its column) and, if it would cross the bottom margin, the page
+    is finished with showPage() and the header is repeated on the next one as a
+    reference to a single form XObject. Rows are drawn as they arrive, so only
+    the current page is ever laid out.
+    """
+
+    def __init__(self, c, columns, x, top, bottom, page_top=None, on_new_page=None,
+                 font='Helvetica', header_font='Helvetica-Bold', font_size=9,
+                 padding=4, min_row_height=20):
+        self.c = c
+        self.columns = columns
+        self.left = [x + offset for offset in accumulate([0] + [col.width for col in columns[:-1]])]
+        self.right = [left + col.width for left, col in zip(self.left, columns)]
+        self.bottom = bottom
+        self.page_top = top if page_top is None else page_top
+        self.on_new_page = on_new_page
+        self.font = font
+        self.header_font = header_font
+        self.font_size = font_size
+        self.leading = font_size * 1.2
+        self.padding = padding
+        self.min_row_height = min_row_height
+        self.y = top
+        self.pages = 1
+        self._header_form = None
+        self._header_y = None
+        self._header_height = 0
+
+    def _lines(self, text, font, width):
+        text = str(text)
+        avail = width - 2 * self.padding
+        if '\n' not in text and stringWidth(text, font, self.font_size) <= avail:
+            return [text]
+        return simpleSplit(text, font, self.font_size, avail) or ['']
+
+    def _measure(self, cells, font):
+        lines = [self._lines(text, font, col.width) for text, col in zip(cells, self.columns)]
+        height = max(self.min_row_height, max(len(l) for l in lines) * self.leading + self.padding)
+        return lines, height
+
+    def _draw(self, lines, font, height):
+        c = self.c
+        c.setFont(font, self.font_size)
+        for cell_lines, col, left, right in zip(lines, self.columns, self.left, self.right):
+            baseline = self.y
+            for line in cell_lines:
+                if col.align == 'right':
+                    c.drawRightString(right - self.padding, baseline, line)
+                else:
+                    c.drawString(left, baseline, line)
+                baseline -= self.leading
+        self.y -= height
+
+    def _break_page(self):
+        self.c.showPage()
+        self.pages += 1
+        self.y = self.page_top
+        if self.on_new_page is not None:
+            self.on_new_page(self.c, self.pages)
+
+    def new_page(self):
+        self._break_page()
+        self.header()
+
+    def header(self):
+        # The header row is drawn once into a form XObject; later pages reference it
+        if self._header_form is None:
+            lines, height = self._measure([col.title for col in self.columns], self.header_font)
+            self._header_form = f'table-header-{id(self)}'
+            self._header_y = self.y
+            self._header_height = height
+            self.c.beginForm(self._header_form)
+            self._draw(lines, self.header_font, height)
+            self.c.endForm()
+            self.y = self._header_y
+        self.c.saveState()
+        self.c.translate(0, self.y - self._header_y)
+        self.c.doForm(self._header_form)
+        self.c.restoreState()
+        self.y -= self._header_height
+
+    def row(self, cells, font=None):
+        font = font or self.font
+        lines, height = self._measure(cells, font)
+        if self.y - height < self.bottom:
+            self.new_page()
+        self._draw(lines, font, height)
+
+    def rows(self, iterable, font=None):
+        for cells in iterable:
+            self.row(cells, font)
+
+    def space(self, height):
+        # Reserve vertical space below the table, breaking the page if needed
+        if self.y - height < self.bottom:
+            self._break_page()
+        y = self.y
+        self.y -= height
+        return y
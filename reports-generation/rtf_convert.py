@@ -0,0 +1,273 @@
+import codecs
+import html
+import re
+
+# One alternative per RTF token kind; a single finditer pass walks the document
+TOKEN_RE = re.compile(r"""
+    \\([a-zA-Z]{1,32})(-?\d{1,10})?[ ]?   # 1, 2: control word with optional parameter
+  | \\'([0-9a-fA-F]{2})                   # 3: hex-escaped byte in the document codepage
+  | \\([^a-zA-Z'])                        # 4: control symbol (\\ \{ \} \~ \* \- \_ ...)
+  | ([{}])                                # 5: group start / end
+  | [\r\n]+                               #    raw newlines carry no meaning in RTF
+  | ([^\\{}\r\n]+)                        # 6: plain text run
+  | (\\)                                  # 7: lone backslash (truncated token)
+""", re.VERBOSE)
+
+# Groups whose content is metadata, not document text
+SKIP_DESTINATIONS = frozenset({
+    'fonttbl', 'colortbl', 'stylesheet', 'info', 'pict', 'listtable', 'listoverridetable',
+    'rsidtbl', 'generator', 'xmlnstbl', 'themedata', 'colorschememapping', 'latentstyles',
+    'datastore', 'fldinst', 'header', 'footer', 'headerl', 'headerr', 'footerl', 'footerr',
+    'object', 'filetbl', 'revtbl', 'mmathPr', 'userprops', 'ftnsep', 'ftnsepc', 'aftnsep',
+})
+
+BREAKS = frozenset({'par', 'line', 'row', 'sect', 'page'})
+SPECIAL_CHARS = {
+    'emdash': '\u2014', 'endash': '\u2013', 'bullet': '\u2022', 'lquote': '\u2018',
+    'rquote': '\u2019', 'ldblquote': '\u201c', 'rdblquote': '\u201d', 'emspace': '\u2003',
+    'enspace': '\u2002', 'qmspace': '\u2005',
+}
+SYMBOLS = {'\\': '\\', '{': '{', '}': '}', '~': '\u00a0', '_': '\u2011', '-': ''}
+
+# Input characters gathered before each feed()/flush when streaming HTML
+HTML_FLUSH_SIZE = 16 * 1024
+
+# Longest control token, used to decide how much of a chunk tail to hold back
+_MAX_TOKEN = 48
+
+
+class PlainTextSink:
+    """Collects converted text as lines (for the PDF route)."""
+
+    def __init__(self, tab='\t'):
+        self.tab_text = tab
+        self.lines = []
+        self._current = []
+
+    def text(self, s, bold, italic):
+        self._current.append(s)
+
+    def tab(self):
+        self._current.append(self.tab_text)
+
+    def par(self):
+        self.lines.append(''.join(self._current))
+        self._current = []
+
+    def close(self):
+        if self._current:
+            self.par()
+
+    def take(self):
+        lines, self.lines = self.lines, []
+        return lines
+
+
+class HtmlSink:
+    """Collects converted text as escaped HTML fragments (for the preview route)."""
+
+    def __init__(self):
+        self.parts = []
+        self._bold = False
+        self._italic = False
+
+    def _style(self, bold, italic):
+        if bold == self._bold and italic == self._italic:
+            return
+        if self._italic:
+            self.parts.append('</i>')
+        if self._bold:
+            self.parts.append('</b>')
+        if bold:
+            self.parts.append('<b>')
+        if italic:
+            self.parts.append('<i>')
+        self._bold = bold
+        self._italic = italic
+
+    def text(self, s, bold, italic):
+        self._style(bold, italic)
+        self.parts.append(html.escape(s, quote=False))
+
+    def tab(self):
+        self.parts.append('&emsp;')
+
+    def par(self):
+        self.parts.append('<br>')
+
+    def close(self):
+        self._style(False, False)
+
+    def take(self):
+        parts, self.parts = self.parts, []
+        return ''.join(parts)
+
+
+class _State:
+    __slots__ = ('skip', 'bold', 'italic', 'uc')
+
+    def __init__(self, skip=False, bold=False, italic=False, uc=1):
+        self.skip = skip
+        self.bold = bold
+        self.italic = italic
+        self.uc = uc
+
+    def copy(self):
+        return _State(self.skip, self.bold, self.italic, self.uc)
+
+
+class RtfConverter:
+    """Streaming RTF tokenizer: feed() text chunks, events go to the sink in one linear pass.
+
+    Tracks group depth, skips metadata destinations (font/colour tables,
+    stylesheets, {\\* ...} groups), decodes \\'xx escapes in the document
+    codepage and \\uN unicode escapes (dropping their \\ucN fallback chars).
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.state = _State()
+        self.stack = []
+        self.codepage = 'cp1252'
+        self._pending = ''
+        self._skip_chars = 0
+        self._group_start = False
+
+    def feed(self, chunk, final=False):
+        data = self._pending + chunk
+        if not final:
+            # A control word may be cut at the chunk edge; keep the tail for next time
+            cut = data.rfind('\\', max(0, len(data) - _MAX_TOKEN))
+            if cut != -1:
+                # Back up to the start of a backslash run so escaped \\ pairs stay together
+                while cut > 0 and data[cut - 1] == '\\':
+                    cut -= 1
+                self._pending = data[cut:]
+                data = data[:cut]
+            else:
+                self._pending = ''
+        else:
+            self._pending = ''
+        self._tokens(data)
+        return self.sink
+
+    def close(self):
+        self.feed('', final=True)
+        self.sink.close()
+        return self.sink
+
+    def _tokens(self, data):
+        sink = self.sink
+        for m in TOKEN_RE.finditer(data):
+            word, group, text = m.group(1), m.group(5), m.group(6)
+            state = self.state
+            if group is not None:
+                if group == '{':
+                    self.stack.append(state)
+                    self.state = state.copy()
+                    self._group_start = True
+                elif self.stack:
+                    self.state = self.stack.pop()
+                    self._group_start = False
+                continue
+            group_start, self._group_start = self._group_start, False
+            if word is not None:
+                self._control_word(word, m.group(2))
+                continue
+            if state.skip:
+                continue
+            if text is not None:
+                if self._skip_chars:
+                    dropped = min(self._skip_chars, len(text))
+                    self._skip_chars -= dropped
+                    text = text[dropped:]
+                if text:
+                    sink.text(text, state.bold, state.italic)
+                continue
+            hex_byte = m.group(3)
+            if hex_byte is not None:
+                if self._skip_chars:
+                    self._skip_chars -= 1
+                else:
+                    sink.text(bytes([int(hex_byte, 16)]).decode(self.codepage, 'replace'), state.bold, state.italic)
+                continue
+            symbol = m.group(4)
+            if symbol is not None:
+                if symbol == '*':
+                    if group_start:
+                        state.skip = True
+                elif symbol in '\r\n':
+                    sink.par()
+                elif symbol in SYMBOLS:
+                    if SYMBOLS[symbol]:
+                        sink.text(SYMBOLS[symbol], state.bold, state.italic)
+                else:
+                    sink.text(symbol, state.bold, state.italic)
+            # group 7 (lone backslash at end of input) is dropped
+
+    def _control_word(self, word, param):
+        state = self.state
+        if word in SKIP_DESTINATIONS:
+            state.skip = True
+            return
+        if state.skip:
+            return
+        sink = self.sink
+        if word == 'u':
+            code = int(param or 0)
+            if code < 0:
+                code += 65536
+            sink.text(chr(code), state.bold, state.italic)
+            self._skip_chars = state.uc
+        elif word == 'uc':
+            state.uc = int(param or 0)
+        elif word in BREAKS:
+            sink.par()
+        elif word == 'tab' or word == 'cell':
+            sink.tab()
+        elif word == 'b':
+            state.bold = param != '0'
+        elif word == 'i':
+            state.italic = param != '0'
+        elif word == 'plain':
+            state.bold = state.italic = False
+        elif word == 'ansicpg':
+            try:
+                self.codepage = codecs.lookup(f'cp{param}').name
+            except LookupError:
+                pass
+        elif word in SPECIAL_CHARS:
+            sink.text(SPECIAL_CHARS[word], state.bold, state.italic)
+
+
+def rtf_to_text_lines(rtf, tab='\t'):
+    converter = RtfConverter(PlainTextSink(tab))
+    converter.feed(rtf)
+    return converter.close().take()
+
+
+def rtf_to_html(rtf):
+    converter = RtfConverter(HtmlSink())
+    converter.feed(rtf)
+    return converter.close().take()
+
+
+def iter_rtf_html(chunks, flush_size=HTML_FLUSH_SIZE):
+    """Convert an iterable of RTF text chunks to HTML, yielding fragments as they are ready."""
+    converter = RtfConverter(HtmlSink())
+    buf = []
+    size = 0
+    for chunk in chunks:
+        buf.append(chunk)
+        size += len(chunk)
+        if size >= flush_size:
+            converter.feed(''.join(buf))
+            buf = []
+            size = 0
+            html_part = converter.sink.take()
+            if html_part:
+                yield html_part
+    converter.feed(''.join(buf))
+    html_part = converter.close().take()
+    if html_part:
+        yield html_part
@@ -0,0 +1,47 @@
+import re
+
+# ${name} placeholders as used by template.rtf
+PLACEHOLDER_RE = re.compile(r'\$\{([^}]*)\}')
+
+
+class CompiledTemplate:
+    """A template parsed once into literal chunks and ${...} slots."""
+
+    def __init__(self, source):
+        self.source = source
+        # parts holds literals and, at slot positions, the raw placeholder text
+        # so that unknown keys render back verbatim like the old re.sub cascade.
+        self.parts = []
+        self.slots = []
+        pos = 0
+        for match in PLACEHOLDER_RE.finditer(source):
+            if match.start() > pos:
+                self.parts.append(source[pos:match.start()])
+            self.slots.append((len(self.parts), match.group(1)))
+            self.parts.append(match.group(0))
+            pos = match.end()
+        if pos < len(source):
+            self.parts.append(source[pos:])
+
+    def render(self, context):
+        out = list(self.parts)
+        for index, name in self.slots:
+            value = context.get(name)
+            if value is not None:
+                out[index] = str(value)
+        return ''.join(out)
+
+    def iter_render(self, context):
+        # Same output as render(), yielded piece by piece without building the document
+        slots = dict(self.slots)
+        for index, part in enumerate(self.parts):
+            name = slots.get(index)
+            if name is not None:
+                value = context.get(name)
+                if value is not None:
+                    part = str(value)
+            yield part
+
+
+def compile_template(source):
+    return CompiledTemplate(source)
@@ -0,0 +1,57 @@
+import os
+import threading
+
+from rtf_template import compile_template
+
+
+class TemplateEntry:
+    """Raw text and compiled form of a template as of one (mtime, size) snapshot."""
+
+    def __init__(self, path, stamp, text):
+        self.path = path
+        self.stamp = stamp
+        self.text = text
+        self.compiled = compile_template(text)
+
+
+class TemplateCache:
+    """Process-wide template cache keyed by path and invalidated on mtime/size change."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path):
+        # Returns None when the file does not exist so callers can keep their 500 path
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(path, None)
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.stamp == stamp:
+                self.hits += 1
+                return entry
+            self.misses += 1
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        entry = TemplateEntry(path, stamp, text)
+        with self._lock:
+            self._entries[path] = entry
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+template_cache = TemplateCache()
@@ -0,0 +1,164 @@
+import json
+import os
+
+import pytest
+
+import generate_invoice_pdf
+from build_manifest import MANIFEST_NAME, BuildManifest, data_hash
+from generate_invoice_pdf import build_invoices
+
+ENTRY = BuildManifest.entry({'header': {'invoice_number': 'A'}}, 'tmpl', 'rtf:2')
+
+
+def invoice(number, total=1):
+    return {'header': {'invoice_number': number, 'total': total}, 'details': []}
+
+
+class StubRender:
+    """Writes a placeholder PDF per invoice; names listed in fail come back as errors."""
+
+    def __init__(self, output_dir, fail=()):
+        self.output_dir = output_dir
+        self.fail = set(fail)
+        self.rendered = []
+
+    def __call__(self, named):
+        for name, invoice in named:
+            path = os.path.join(self.output_dir, name)
+            self.rendered.append(name)
+            if name in self.fail:
+                yield path, 'boom'
+                continue
+            with open(path, 'w') as f:
+                f.write(json.dumps(invoice))
+            yield path, None
+
+
+def build(output_dir, invoices, fail=(), **kwargs):
+    render = StubRender(output_dir, fail)
+    stats = build_invoices(invoices, 'template', output_dir, 'rtf', render, **kwargs)
+    return stats, render.rendered
+
+
+def touch(directory, name):
+    with open(os.path.join(directory, name), 'w') as f:
+        f.write('pdf')
+
+
+def test_data_hash_ignores_key_order():
+    assert data_hash({'a': 1, 'b': [1, 2]}) == data_hash({'b': [1, 2], 'a': 1})
+    assert data_hash({'a': 1}) != data_hash({'a': 2})
+
+
+def test_is_current_needs_matching_entry_and_existing_file(tmp_path):
+    manifest = BuildManifest(str(tmp_path))
+    manifest.record('A.pdf', ENTRY)
+    assert not manifest.is_current('A.pdf', ENTRY)
+    touch(tmp_path, 'A.pdf')
+    assert manifest.is_current('A.pdf', ENTRY)
+    assert not manifest.is_current('A.pdf', dict(ENTRY, renderer='reportlab:2'))
+    assert not manifest.is_current('A.pdf', dict(ENTRY, template='other'))
+
+
+def test_save_and_reload(tmp_path):
+    manifest = BuildManifest(str(tmp_path))
+    manifest.record('A.pdf', ENTRY)
+    manifest.save()
+    assert BuildManifest(str(tmp_path)).entries == {'A.pdf': ENTRY}
+    assert not os.path.exists(manifest.path + '.tmp')
+
+
+@pytest.mark.parametrize('stored', ['{"version": 0, "outputs": {"A.pdf": {}}}', 'not json', '[]'])
+def test_other_version_or_unreadable_manifest_starts_empty(tmp_path, stored):
+    (tmp_path / MANIFEST_NAME).write_text(stored)
+    assert BuildManifest(str(tmp_path)).entries == {}
+
+
+def test_remove_orphans_deletes_files_no_longer_produced(tmp_path):
+    manifest = BuildManifest(str(tmp_path))
+    for name in ('A.pdf', 'B.pdf', 'C.pdf'):
+        touch(tmp_path, name)
+        manifest.record(name, ENTRY)
+    os.remove(tmp_path / 'C.pdf')      # already gone is fine
+    touch(tmp_path, 'unrecorded.pdf')  # never built by us, never deleted
+    assert sorted(manifest.remove_orphans(['A.pdf'])) == ['B.pdf', 'C.pdf']
+    assert sorted(os.listdir(tmp_path)) == ['A.pdf', 'unrecorded.pdf']
+    assert list(manifest.entries) == ['A.pdf']
+
+
+def test_rebuild_skips_unchanged_invoices(tmp_path):
+    invoices = [invoice('A'), invoice('B'), invoice('C')]
+    stats, rendered = build(str(tmp_path), invoices)
+    assert (stats.rendered, stats.skipped, rendered) == (3, 0, ['A.pdf', 'B.pdf', 'C.pdf'])
+
+    invoices[1] = invoice('B', total=2)
+    stats, rendered = build(str(tmp_path), invoices)
+    assert (stats.rendered, stats.skipped, rendered) == (1, 2, ['B.pdf'])
+
+
+def test_full_build_renders_everything(tmp_path):
+    invoices = [invoice('A'), invoice('B')]
+    build(str(tmp_path), invoices)
+    stats, rendered = build(str(tmp_path), invoices, full=True)
+    assert (stats.rendered, stats.skipped, rendered) == (2, 0, ['A.pdf', 'B.pdf'])
+
+
+def test_deleted_output_is_rebuilt(tmp_path):
+    build(str(tmp_path), [invoice('A'), invoice('B')])
+    os.remove(tmp_path / 'A.pdf')
+    stats, rendered = build(str(tmp_path), [invoice('A'), invoice('B')])
+    assert (stats.skipped, rendered) == (1, ['A.pdf'])
+
+
+def test_template_or_renderer_change_rebuilds(tmp_path):
+    invoices = [invoice('A')]
+    build(str(tmp_path), invoices)
+    render = StubRender(str(tmp_path))
+    build_invoices(invoices, 'new template', str(tmp_path), 'rtf', render)
+    build_invoices(invoices, 'new template', str(tmp_path), 'reportlab', render)
+    assert render.rendered == ['A.pdf', 'A.pdf']
+
+
+def test_failed_invoices_are_retried(tmp_path):
+    stats, _ = build(str(tmp_path), [invoice('A'), invoice('B')], fail={'B.pdf'})
+    assert stats.rendered == 1 and [os.path.basename(p) for p, _ in stats.failed] == ['B.pdf']
+    stats, rendered = build(str(tmp_path), [invoice('A'), invoice('B')])
+    assert (stats.skipped, rendered, stats.failed) == (1, ['B.pdf'], [])
+
+
+def test_orphans_removed_after_full_input(tmp_path):
+    build(str(tmp_path), [invoice('A'), invoice('B'), invoice('C')])
+    stats, rendered = build(str(tmp_path), [invoice('A'), invoice('C')])
+    assert (rendered, stats.removed) == ([], ['B.pdf'])
+    assert sorted(n for n in os.listdir(tmp_path) if n.endswith('.pdf')) == ['A.pdf', 'C.pdf']
+    assert 'B.pdf' not in BuildManifest(str(tmp_path)).entries
+
+
+def test_interrupted_build_keeps_progress_and_orphans(tmp_path):
+    build(str(tmp_path), [invoice('A'), invoice('Z')])
+
+    def interrupted():
+        yield invoice('A', total=5)
+        yield invoice('B')
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        build(str(tmp_path), interrupted())
+    # Z is not known to be orphaned until the whole input has been read
+    assert os.path.exists(tmp_path / 'Z.pdf')
+    stats, rendered = build(str(tmp_path), [invoice('A', total=5), invoice('B'), invoice('C')])
+    assert (stats.skipped, rendered, stats.removed) == (2, ['C.pdf'], ['Z.pdf'])
+
+
+def test_manifest_is_checkpointed(tmp_path, monkeypatch):
+    monkeypatch.setattr(generate_invoice_pdf, 'MANIFEST_CHECKPOINT', 2)
+    saved = []
+
+    def render(named):
+        # Resumed once build_invoices has handled the result just yielded
+        for result in StubRender(str(tmp_path))(named):
+            yield result
+            saved.append(len(BuildManifest(str(tmp_path)).entries))
+
+    build_invoices([invoice(n) for n in 'ABCDE'], None, str(tmp_path), 'reportlab', render)
+    assert saved == [0, 2, 2, 4, 4]
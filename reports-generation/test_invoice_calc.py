@@ -0,0 +1,122 @@
+import pytest
+
+from invoice_calc import RATE_SCALE, LineItems, compute_invoice, format_cents, parse_rate, to_cents
+
+
+def invoice(details, **header):
+    return {'header': header, 'details': details}
+
+
+def line(quantity, unit_price, **extra):
+    return {'quantity': quantity, 'unit_price': unit_price, **extra}
+
+
+@pytest.mark.parametrize('quantity, unit_price, cents', [
+    (1, 0.025, 3),        # exact half cent rounds up
+    (1, 0.015, 2),
+    (-1, 0.025, -3),      # and away from zero for credits
+    (1, 1.005, 101),      # 1.005 is 1.00499... as a float; fixed point still sees the half
+    (3, 0.1, 30),         # no 0.30000000000000004 drift
+    (0.5, 0.01, 1),
+    (1.234, 10, 1234),
+    (2, '19.99', 3998),   # numeric strings are accepted
+])
+def test_line_totals_round_half_up(quantity, unit_price, cents):
+    assert compute_invoice(invoice([line(quantity, unit_price)])).line_cents.tolist() == [cents]
+
+
+def test_subtotal_is_sum_of_rounded_lines():
+    totals = compute_invoice(invoice([line(1, 0.005)] * 3))
+    assert totals.line_cents.tolist() == [1, 1, 1]
+    assert totals.subtotal == 3
+
+
+@pytest.mark.parametrize('value, rate', [
+    ('8%', 80000), ('0.08', 80000), (0.08, 80000), ('8.25%', 82500), (' 7% ', 70000), ('', 0), (None, 0),
+])
+def test_parse_rate(value, rate):
+    assert parse_rate(value) == rate
+
+
+def test_parse_rate_rejects_garbage():
+    with pytest.raises(ValueError, match='Invalid rate'):
+        parse_rate('eight percent')
+
+
+def test_discount_amount_then_tax_on_discounted_subtotal():
+    totals = compute_invoice(invoice([line(1, 100)], discount='10', tax_rate='8.25%'))
+    assert (totals.subtotal, totals.discount, totals.tax, totals.total) == (10000, 1000, 743, 9743)
+
+
+def test_discount_rate():
+    totals = compute_invoice(invoice([line(1, 33.33)], discount_rate='10%'))
+    assert totals.discount == 333      # 333.3 cents, rounded half-up
+    assert totals.total == 3000
+    assert totals.tax_rate == 0 and RATE_SCALE == 1000000
+
+
+@pytest.mark.parametrize('header', [{'discount': '101'}, {'discount': '-1'}, {'discount_rate': '150%'}])
+def test_discount_outside_subtotal_is_rejected(header):
+    with pytest.raises(ValueError, match='Discount'):
+        compute_invoice(invoice([line(1, 100)], **header))
+
+
+@pytest.mark.parametrize('details, header, message', [
+    ([line('x', 1)], {}, "invalid quantity 'x'"),
+    ([line(1, 2), line(1, 'abc')], {}, "Line 2: invalid unit_price 'abc'"),
+    ([line(1, 2, total='n/a')], {}, "invalid total 'n/a'"),
+    ([line(1, 2)], {'total': '$1,234.00'}, 'Invalid amount'),
+    ([line(1, 2)], {'tax_rate': 'high'}, 'Invalid rate'),
+])
+def test_invalid_fields_raise_value_error(details, header, message):
+    with pytest.raises(ValueError, match=message):
+        compute_invoice(invoice(details, **header))
+
+
+def test_blank_and_missing_values_count_as_zero():
+    totals = compute_invoice(invoice([line('', 5), {'unit_price': 5}, line(2, None)]))
+    assert totals.line_cents.tolist() == [0, 0, 0]
+    assert totals.ok
+
+
+def test_mismatches_against_provided_totals():
+    totals = compute_invoice(invoice([line(2, 1.5, total=3), line(1, 0.025, total=0.02), line(1, 1)],
+                                     total='4.00'))
+    assert totals.mismatches == [(1, 2, 3)]
+    assert totals.total_mismatch == (400, 403)
+    assert not totals.ok
+    assert totals.variables()['mismatch_count'] == 2
+
+
+def test_matching_totals_are_ok():
+    assert compute_invoice(invoice([line(2, 1.5, total='3.00')], total=3, tax_rate='0%')).ok
+
+
+def test_template_variables_and_line_items():
+    data = invoice([line(2, 1.25, description='Pen')], tax_rate='10%')
+    totals = compute_invoice(data)
+    assert totals.variables() == {
+        'subtotal': '2.50', 'discount': '0.00', 'tax': '0.25', 'tax_rate': '10%',
+        'total_due': '2.75', 'line_count': 1, 'mismatch_count': 0,
+    }
+    items = LineItems(data['details'], totals)
+    assert len(items) == 1
+    assert list(items)[0]['line_total'] == '2.50'
+
+
+@pytest.mark.parametrize('cents, args, text', [
+    (123456, (), '1234.56'),
+    (5, (), '0.05'),
+    (-5, (), '-0.05'),
+    (123456789, ('$', ','), '$1,234,567.89'),
+    (-100, ('$', ','), '-$1.00'),
+    (0, ('$', ','), '$0.00'),
+])
+def test_format_cents(cents, args, text):
+    assert format_cents(cents, *args) == text
+
+
+def test_to_cents_rounds_half_up():
+    assert to_cents('0.005') == 1
+    assert to_cents('-0.005') == -1
+    assert to_cents(12) == 1200
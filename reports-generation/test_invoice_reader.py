@@ -0,0 +1,47 @@
+import io
+import json
+
+import pytest
+
+from invoice_reader import _scan_invoices
+
+# Numbers next to every kind of delimiter, so some read boundary falls inside each of them
+DOCUMENT = json.dumps({
+    'count': 12.50,
+    'scale': -1e3,
+    'ratio': 1.5E+2,
+    'flag': True,
+    'note': None,
+    'invoices': [
+        {'header': {'invoice_number': 'INV-1', 'total': 1234.5}, 'details': [{'quantity': 3, 'unit_price': 0.25}]},
+        {'header': {'invoice_number': 'INV-"2"', 'discount': 0}, 'details': []},
+        {'header': {'invoice_number': 'INV-3'}, 'details': [{'quantity': 2.0e-1, 'unit_price': 100}]},
+    ],
+    'after': [7, 8.75, -0.5],
+    'last': 42,
+}, indent=1)
+
+
+def scan(text, key='invoices', read_size=1):
+    return list(_scan_invoices(io.StringIO(text), key, read_size))
+
+
+@pytest.mark.parametrize('read_size', range(1, len(DOCUMENT) + 1))
+def test_matches_json_load_at_every_read_size(read_size):
+    assert scan(DOCUMENT, read_size=read_size) == json.load(io.StringIO(DOCUMENT))['invoices']
+
+
+@pytest.mark.parametrize('read_size', range(1, 16))
+def test_number_split_after_point_or_exponent(read_size):
+    text = '{"count": 12.50, "big": 1e3, "invoices": [{"a": 1}]}'
+    assert scan(text, read_size=read_size) == [{'a': 1}]
+
+
+@pytest.mark.parametrize('text', ['{}', '{"invoices": []}', '{"other": 1.5}'])
+def test_no_invoices(text):
+    assert scan(text, read_size=2) == []
+
+
+def test_truncated_input_raises():
+    with pytest.raises(ValueError):
+        scan('{"invoices": [{"a": 1}', read_size=3)
@@ -0,0 +1,75 @@
+import io
+
+import pytest
+
+from invoice_template import CompiledTemplate, Context, TemplateSyntaxError, compile_template
+
+INVOICE = {
+    'header': {'invoice_number': 'INV-7', 'customer_name': 'Acme'},
+    'details': [
+        {'description': 'Widget', 'quantity': 2, 'tags': ['a', 'b']},
+        {'description': 'Gadget', 'quantity': 1, 'tags': []},
+    ],
+}
+
+
+def render(source, context=INVOICE):
+    return CompiledTemplate(source).render(context)
+
+
+def test_variables_and_dotted_paths():
+    assert render('${header.invoice_number} $header.customer_name') == 'INV-7 Acme'
+    assert render('$details.1.description') == 'Gadget'
+
+
+def test_unknown_variables_render_verbatim():
+    assert render('$missing ${header.nope} $details.9') == '$missing ${header.nope} $details.9'
+
+
+def test_foreach_with_default_alias():
+    assert render('@foreach($details)[$d.description x$d.quantity]@end-foreach') == '[Widget x2][Gadget x1]'
+
+
+def test_nested_foreach_with_aliases():
+    source = '@foreach(details as item)$item.description:@foreach(item.tags as t)<$t>@end-foreach;@end-foreach'
+    assert render(source) == 'Widget:<a><b>;Gadget:;'
+
+
+def test_inner_alias_shadows_outer_scope():
+    context = Context({'d': 'outer', 'rows': [1, 2]})
+    assert render('$d|@foreach(rows)$d@end-foreach|$d', context) == 'outer|12|outer'
+
+
+def test_foreach_over_missing_list_renders_nothing():
+    assert render('a@foreach(nothing)x@end-foreach b') == 'a b'
+
+
+@pytest.mark.parametrize('source, message', [
+    ('@foreach(details)x', 'has no @end-foreach'),
+    ('@foreach(details)@foreach(d.tags)x@end-foreach', 'has no @end-foreach'),
+    ('x@end-foreach', 'without @foreach'),
+    ('@foreach(details)x@end-foreach@end-foreach', 'without @foreach'),
+])
+def test_unbalanced_loops(source, message):
+    with pytest.raises(TemplateSyntaxError, match=message):
+        CompiledTemplate(source)
+
+
+def test_syntax_error_is_a_value_error():
+    assert issubclass(TemplateSyntaxError, ValueError)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 64, 1 << 16])
+def test_render_to_file_matches_render_at_any_chunk_size(chunk_size):
+    source = 'No. $header.invoice_number\n@foreach(details)- $d.description ($d.quantity)\n@end-foreach'
+    compiled = CompiledTemplate(source)
+    out = io.StringIO()
+    written = compiled.render_to_file(out, INVOICE, chunk_size=chunk_size)
+    assert out.getvalue() == compiled.render(INVOICE)
+    assert written == len(out.getvalue())
+
+
+def test_compile_template_caches_by_content():
+    source = 'cached $header.invoice_number'
+    assert compile_template(source) is compile_template(''.join(['cached ', '$header.invoice_number']))
+    assert compile_template(source) is not compile_template(source + ' ')
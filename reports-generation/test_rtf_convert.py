@@ -0,0 +1,76 @@
+import pytest
+
+from rtf_convert import HtmlSink, PlainTextSink, RtfConverter, iter_rtf_html, rtf_to_html, rtf_to_text_lines
+
+DOCUMENT = (
+    r'{\rtf1\ansi\ansicpg1252\deff0{\fonttbl{\f0\fswiss Arial;}{\f1 Times;}}'
+    r'{\colortbl;\red0\green0\blue0;}{\stylesheet{\s0 Normal;}}'
+    r'{\info{\title Hidden title}{\author Nobody}}'
+    r'{\*\generator Some Writer 1.0;}{\*\unknowndest ignored text}'
+    '\r\n\\fs24 \\b Caf\\\'e9 Report\\b0\\par\r\n'
+    r'Price\tab 12\{net\}\tab back\\slash\par '
+    r'{\i italic \u8364? euro}\par '
+    r'{\uc2 two fallbacks \u8212\'97\'97 done}\par '
+    r'\ldblquote quoted\rdblquote\~nbsp\-soft\_hard\line '
+    r'{\header page header}{\footer page footer}'
+    r'\plain tail text\par}'
+)
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def feed_chunks(sink, chunks):
+    converter = RtfConverter(sink)
+    for chunk in chunks:
+        converter.feed(chunk)
+    return converter.close().take()
+
+
+def test_text_lines():
+    assert rtf_to_text_lines(DOCUMENT, tab=' | ') == [
+        'Café Report',
+        'Price | 12{net} | back\\slash',
+        'italic € euro',
+        'two fallbacks — done',
+        '\u201cquoted\u201d\u00a0nbspsoft\u2011hard',
+        'tail text',
+    ]
+
+
+def test_destinations_are_skipped():
+    lines = '\n'.join(rtf_to_text_lines(DOCUMENT))
+    for hidden in ('Arial', 'Normal', 'Hidden title', 'Some Writer', 'ignored text', 'page header', 'page footer'):
+        assert hidden not in lines
+
+
+def test_hex_escapes_follow_the_codepage():
+    assert rtf_to_text_lines(r"{\rtf1\ansi\ansicpg1251 \'c0\'e1\par}") == ['Аб']
+    assert rtf_to_text_lines(r"{\rtf1\ansi \'e9\par}") == ['é']
+
+
+def test_unicode_escapes():
+    # Negative values are signed 16-bit; \uc0 means no fallback characters follow
+    assert rtf_to_text_lines(r'{\rtf1 \u-223?\uc0\u233 x\par}') == ['\uff21\u00e9x']
+
+
+def test_html_escapes_and_styles():
+    html = rtf_to_html(r'{\rtf1 \b a<b\b0 {\i &c}\par}')
+    assert '&lt;' in html and '&amp;' in html
+    assert '<b>' in html and '<i>' in html
+
+
+@pytest.mark.parametrize('size', range(1, len(DOCUMENT) + 1))
+def test_text_output_is_independent_of_chunk_size(size):
+    assert feed_chunks(PlainTextSink(), chunked(DOCUMENT, size)) == rtf_to_text_lines(DOCUMENT)
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 5, 7, 16, 47, 48, 49, 100])
+def test_html_output_is_independent_of_chunk_size(size):
+    assert feed_chunks(HtmlSink(), chunked(DOCUMENT, size)) == rtf_to_html(DOCUMENT)
+
+
+@pytest.mark.parametrize('flush_size', [1, 10, 64, 1 << 20])
+def test_streamed_html_matches_whole_document(flush_size):
+    assert ''.join(iter_rtf_html(chunked(DOCUMENT, 9), flush_size)) == rtf_to_html(DOCUMENT)
@@ -0,0 +1,153 @@
+import io
+import re
+import tempfile
+from itertools import groupby
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+
+from metrics import StageTimer
+
+# Shared style objects: created once and assigned to every styled cell
+TITLE_FONT = Font(bold=True, size=16)
+CENTER = Alignment(horizontal='center')
+HEADER_FONT = Font(bold=True, color='B97A2A')
+HEADER_FILL = PatternFill('solid', fgColor='FFF3E0')
+TOTALS_FONT = Font(bold=True, color='FFFFFF')
+TOTALS_FILL = PatternFill('solid', fgColor='21523B')
+GOAL_FONT = HEADER_FONT
+GOAL_FILL = HEADER_FILL
+VARIANCE_FONT = Font(bold=True, color='21523B')
+VARIANCE_FILL = PatternFill('solid', fgColor='E0E0E0')
+
+COLUMN_WIDTHS = [12, 14, 14, 14, 14, 14, 14, 14, 14, 14, 16]
+CHUNK_SIZE = 64 * 1024
+
+
+def sheet_title(name, used):
+    # Excel sheet titles: max 31 chars, no []:*?/\ and unique per workbook
+    base = re.sub(r'[\[\]:*?/\\]', '_', str(name)).strip() or 'Sheet'
+    base = base[:31]
+    title = base
+    n = 2
+    while title.lower() in used:
+        suffix = f' ({n})'
+        title = base[:31 - len(suffix)] + suffix
+        n += 1
+    used.add(title.lower())
+    return title
+
+
+def _styled_row(ws, values, font=None, fill=None, alignment=None):
+    row = []
+    for value in values:
+        cell = WriteOnlyCell(ws, value=value)
+        if font is not None:
+            cell.font = font
+        if fill is not None:
+            cell.fill = fill
+        if alignment is not None:
+            cell.alignment = alignment
+        row.append(cell)
+    return row
+
+
+def render_xls(data):
+    """Render one weekly report as a styled single-sheet workbook."""
+    timer = StageTimer()
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = 'Weekly Report'
+    ws.merge_cells('A1:K1')
+    ws['A1'] = 'WEEKLY SALES ACTIVITY'
+    ws['A1'].font = TITLE_FONT
+    ws['A1'].alignment = CENTER
+    ws['A2'] = 'SALESPERSON'
+    ws['B2'] = data['salesperson']
+    ws['D2'] = 'WEEK ENDING'
+    ws['E2'] = data['weekEnding']
+    ws['G2'] = 'LOCATION'
+    ws['H2'] = data['location']
+    ws['J2'] = "TODAY'S DATE"
+    ws['K2'] = data['today']
+    ws.append([])
+    header = ['DAYS'] + data['categories']
+    ws.append(header)
+    for cell in ws[4]:
+        cell.font = HEADER_FONT
+        cell.fill = HEADER_FILL
+        cell.alignment = CENTER
+    for day in data['days']:
+        ws.append([day['name']] + [f"${v:.2f}" if v else "$0.00" for v in day['values']])
+    ws.append(['Totals'] + [f"${v:.2f}" for v in data['totals']])
+    for cell in ws[ws.max_row]:
+        cell.font = TOTALS_FONT
+        cell.fill = TOTALS_FILL
+    ws.append(['GOAL'] + [f"${v:.2f}" for v in data['goal']])
+    for cell in ws[ws.max_row]:
+        cell.font = GOAL_FONT
+        cell.fill = GOAL_FILL
+    ws.append(['VARIANCE'] + [f"${v:+.2f}" for v in data['variance']])
+    for cell in ws[ws.max_row]:
+        cell.font = VARIANCE_FONT
+        cell.fill = VARIANCE_FILL
+    ws.append([])
+    ws.append(['*EXPLANATION'])
+    ws.append([''])
+    ws.append(['Approval'])
+    ws.append([''])
+    for i, w in enumerate(COLUMN_WIDTHS, 1):
+        ws.column_dimensions[get_column_letter(i)].width = w
+    timer.lap('build')
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    timer.lap('save')
+    return buffer.getvalue()
+
+
+def write_week_rows(ws, data):
+    """Append one week's report block to a write-only worksheet."""
+    ws.append(['WEEK ENDING', data['weekEnding'], None, 'LOCATION', data['location'], None, "TODAY'S DATE", data['today']])
+    ws.append(_styled_row(ws, ['DAYS'] + list(data['categories']), HEADER_FONT, HEADER_FILL, CENTER))
+    for day in data['days']:
+        ws.append([day['name']] + [f"${v:.2f}" if v else "$0.00" for v in day['values']])
+    ws.append(_styled_row(ws, ['Totals'] + [f"${v:.2f}" for v in data['totals']], TOTALS_FONT, TOTALS_FILL))
+    ws.append(_styled_row(ws, ['GOAL'] + [f"${v:.2f}" for v in data['goal']], GOAL_FONT, GOAL_FILL))
+    ws.append(_styled_row(ws, ['VARIANCE'] + [f"${v:+.2f}" for v in data['variance']], VARIANCE_FONT, VARIANCE_FILL))
+    ws.append([])
+
+
+def write_streaming_workbook(reports, fileobj):
+    """Write reports (ordered by salesperson) as one write-only sheet per salesperson.
+
+    Rows are written as the reports iterable yields them, so memory use does not
+    grow with the number of weeks.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    used = set()
+    for salesperson, weeks in groupby(reports, key=lambda r: r['salesperson']):
+        ws = wb.create_sheet(title=sheet_title(salesperson, used))
+        for i, w in enumerate(COLUMN_WIDTHS, 1):
+            ws.column_dimensions[get_column_letter(i)].width = w
+        ws.append(_styled_row(ws, ['WEEKLY SALES ACTIVITY'], TITLE_FONT))
+        ws.append(['SALESPERSON', salesperson])
+        ws.append([])
+        for week in weeks:
+            write_week_rows(ws, week)
+    if not wb.worksheets:
+        wb.create_sheet(title='Weekly Report')
+    wb.save(fileobj)
+
+
+def stream_xlsx(reports, chunk_size=CHUNK_SIZE):
+    """Build the workbook in a temporary file and yield it back in chunks."""
+    with tempfile.TemporaryFile() as tmp:
+        write_streaming_workbook(reports, tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk